@@ -1,5 +1,6 @@
 import logging
 import math
+import os
 from typing import List, NamedTuple, Union
 
 import json
@@ -116,23 +117,56 @@ def run_use_case(model: Runnable, eval_use_case: NamedTuple, output_df: pd.DataF
                 outputs_list = outputs_list.replace("\\'", "'")
                 outputs_list = json.loads(outputs_list)
             # fill *_actual columns in output_df with last FindDocs node
-            if "state" in inputs_dict:
-                output_df.loc[output_df.index == eval_use_case.Index, "state_filter_actual"] = inputs_dict["state"]
-            if "county" in inputs_dict:
-                output_df.loc[output_df.index == eval_use_case.Index, "county_filter_actual"] = inputs_dict["county"]
-            if "commodity" in inputs_dict:
-                output_df.loc[output_df.index == eval_use_case.Index, "commodity_filter_actual"] = inputs_dict["commodity"]
-            if "doc_category" in inputs_dict:
-                output_df.loc[output_df.index == eval_use_case.Index, "doc_category_filter_actual"] = inputs_dict["doc_category"]
-            if len(outputs_list) >= 1:
-                output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc1_actual"] = extract_s3_key(outputs_list[0])
-                output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc1_page_actual"] = extract_page_id(outputs_list[0])
-            if len(outputs_list) >= 2:
-                output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc2_actual"] = extract_s3_key(outputs_list[1])
-                output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc2_page_actual"] = extract_page_id(outputs_list[1])
-            if len(outputs_list) >= 3:
-                output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc3_actual"] = extract_s3_key(outputs_list[2])
-                output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc3_page_actual"] = extract_page_id(outputs_list[2])
+            fill_actual_columns(output_df, eval_use_case, inputs_dict, outputs_list)
+
+
+def run_use_cases_retrieval_only(eval_df: pd.DataFrame, output_df: pd.DataFrame) -> None:
+    """
+    Runs the document retriever alone on every use case, using expected filters, so that retrieval
+    can be evaluated independently from filter extraction. Use cases are queried concurrently.
+    """
+    from croptalk.document_retriever import DocumentRetriever
+
+    doc_retriever = DocumentRetriever(collection_name=os.getenv("VECTORSTORE_COLLECTION"))
+
+    specs = []
+    for eval_use_case in eval_df.itertuples(name="EvalUseCase"):
+        filters = {
+            "state": eval_use_case.state_filter_expected,
+            "county": eval_use_case.county_filter_expected,
+            "commodity": eval_use_case.commodity_filter_expected,
+            "doc_category": eval_use_case.doc_category_filter_expected,
+        }
+        filters = {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in filters.items()}
+        specs.append((eval_use_case.query, filters))
+
+    logger.info(f"Running document retriever on {len(specs)} use cases")
+    outputs = doc_retriever.get_documents_batch(specs, top_k=3)
+
+    for eval_use_case, (_, inputs_dict), outputs_list in zip(eval_df.itertuples(name="EvalUseCase"), specs, outputs):
+        fill_actual_columns(output_df, eval_use_case, inputs_dict, outputs_list)
+
+
+def fill_actual_columns(
+    output_df: pd.DataFrame, eval_use_case: NamedTuple, inputs_dict: dict, outputs_list: List[str],
+) -> None:
+    if "state" in inputs_dict:
+        output_df.loc[output_df.index == eval_use_case.Index, "state_filter_actual"] = inputs_dict["state"]
+    if "county" in inputs_dict:
+        output_df.loc[output_df.index == eval_use_case.Index, "county_filter_actual"] = inputs_dict["county"]
+    if "commodity" in inputs_dict:
+        output_df.loc[output_df.index == eval_use_case.Index, "commodity_filter_actual"] = inputs_dict["commodity"]
+    if "doc_category" in inputs_dict:
+        output_df.loc[output_df.index == eval_use_case.Index, "doc_category_filter_actual"] = inputs_dict["doc_category"]
+    if len(outputs_list) >= 1:
+        output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc1_actual"] = extract_s3_key(outputs_list[0])
+        output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc1_page_actual"] = extract_page_id(outputs_list[0])
+    if len(outputs_list) >= 2:
+        output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc2_actual"] = extract_s3_key(outputs_list[1])
+        output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc2_page_actual"] = extract_page_id(outputs_list[1])
+    if len(outputs_list) >= 3:
+        output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc3_actual"] = extract_s3_key(outputs_list[2])
+        output_df.loc[output_df.index == eval_use_case.Index, "retrieved_doc3_page_actual"] = extract_page_id(outputs_list[2])
 
 
 def evaluate_use_case(output_df: pd.DataFrame) -> None:
@@ -283,20 +317,23 @@ if __name__ == "__main__":
     output_df = get_output_df(eval_df)
     logger.info("Creating output_df")
 
-    # load model
-    logger.info("Loading model")
-    if args.use_model_llm:
-        from croptalk.model_llm import model
-
-        memory = None
+    if args.retrieval_only:
+        run_use_cases_retrieval_only(eval_df, output_df)
     else:
-        from croptalk.model_openai_functions import model, memory
-
-    # run model on each use case
-    for eval_use_case in eval_df.itertuples(name="EvalUseCase"):
-        if memory:
-            memory.clear()
-        run_use_case(model, eval_use_case, output_df)
+        # load model
+        logger.info("Loading model")
+        if args.use_model_llm:
+            from croptalk.model_llm import model
+
+            memory = None
+        else:
+            from croptalk.model_openai_functions import model, memory
+
+        # run model on each use case
+        for eval_use_case in eval_df.itertuples(name="EvalUseCase"):
+            if memory:
+                memory.clear()
+            run_use_case(model, eval_use_case, output_df)
 
     # evaluate each use case
     evaluate_use_case(output_df)
@@ -0,0 +1,71 @@
+import argparse
+import logging
+import time
+from typing import Optional
+
+import pandas as pd
+
+from croptalk.entity_extractor import LocalEntityExtractor
+from croptalk.name_index import get_name_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+# extracted field -> expected column of the evaluation file
+FIELDS = {
+    "state": "state_filter_expected",
+    "county": "county_filter_expected",
+    "commodity": "commodity_filter_expected",
+    "doc_category": "doc_category_filter_expected",
+}
+
+
+def normalize(value: Optional[str]) -> Optional[str]:
+    if value is None or (isinstance(value, float) and pd.isna(value)) or not str(value).strip():
+        return None
+    return str(value).strip().lower()
+
+
+def parse_args_evaluate_entity_extraction() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "eval_path",
+        help="CSV file path that contains evaluation use cases, with expected filters",
+        nargs="?",
+        default="_scripts/evaluate_doc_retrieval.csv",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args_evaluate_entity_extraction()
+
+    eval_df = pd.read_csv(args.eval_path, header=0, dtype=str)
+    extractor = LocalEntityExtractor(get_name_index())
+
+    rows = []
+    for _, row in eval_df.iterrows():
+        start = time.perf_counter()
+        entities = extractor.extract(str(row["query"]))
+        latency = time.perf_counter() - start
+
+        result = {"test_id": row["test_id"], "confident": entities.confident, "latency_us": latency * 1e6}
+        for field, column in FIELDS.items():
+            actual = getattr(entities, field)
+            result[f"{field}_actual"] = actual
+            result[f"{field}_correct"] = normalize(actual) == normalize(row[column])
+        result["all_correct"] = all(result[f"{field}_correct"] for field in FIELDS)
+        rows.append(result)
+
+    results = pd.DataFrame(rows)
+    confident = results[results["confident"]]
+
+    logger.info(f"{len(results)} use cases, {len(confident)} ({len(confident) / len(results):.0%}) extracted "
+                f"confidently (i.e. without LLM), median latency {results['latency_us'].median():.0f}us")
+    for field in list(FIELDS) + ["all"]:
+        logger.info(f"{field} accuracy: {results[f'{field}_correct'].mean():.0%} overall, "
+                    f"{confident[f'{field}_correct'].mean():.0%} on confident use cases")
+
+    errors = results[results["confident"] & ~results["all_correct"]]
+    if not errors.empty:
+        logger.info(f"Confident errors:\n{errors.to_string()}")
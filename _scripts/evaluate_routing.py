@@ -0,0 +1,83 @@
+import argparse
+import logging
+import os
+import time
+
+import pandas as pd
+
+from croptalk.route_classifier import (OTHER_TOPIC, ROUTE_CONFIDENCE_THRESHOLD, TOOLS_TOPIC,
+                                       get_route_classifier)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+# evaluation file -> (separator, expected topic of its questions)
+EVAL_FILES = {
+    "_scripts/evaluate_doc_retrieval.csv": (",", OTHER_TOPIC),
+    "_scripts/evaluate_tools_SOB.csv": (";", TOOLS_TOPIC),
+    "_scripts/evaluate_tools_SP_doc.csv": (";", TOOLS_TOPIC),
+}
+
+
+def get_llm_route_chain():
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import PromptTemplate
+
+    from croptalk.tools import ROUTE_TEMPLATE
+    from croptalk.utils import initialize_llm
+
+    return PromptTemplate.from_template(ROUTE_TEMPLATE) | initialize_llm(os.getenv("MODEL_NAME")) | StrOutputParser()
+
+
+def parse_args_evaluate_routing() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--with-llm",
+        help="route questions the local classifier is not confident about with the LLM, as the chain does",
+        action="store_true",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args_evaluate_routing()
+
+    route_classifier = get_route_classifier()
+    llm_route_chain = get_llm_route_chain() if args.with_llm else None
+
+    rows = []
+    for eval_path, (sep, expected_topic) in EVAL_FILES.items():
+        eval_df = pd.read_csv(eval_path, sep=sep, header=0, dtype=str)
+        for query in eval_df["query"]:
+            start = time.perf_counter()
+            decision = route_classifier.classify(query)
+            latency = time.perf_counter() - start
+
+            result = {"file": os.path.basename(eval_path), "query": query, "expected": expected_topic,
+                      "local_topic": decision.topic, "confidence": decision.confidence, "source": decision.source,
+                      "confident": decision.confidence >= ROUTE_CONFIDENCE_THRESHOLD, "latency_us": latency * 1e6}
+            if result["confident"]:
+                result["topic"] = decision.topic
+            elif llm_route_chain is not None:
+                llm_topic = llm_route_chain.invoke({"question": query})
+                result["topic"] = TOOLS_TOPIC if TOOLS_TOPIC in llm_topic.lower() else OTHER_TOPIC
+            else:
+                result["topic"] = None
+            rows.append(result)
+
+    results = pd.DataFrame(rows)
+    results["local_correct"] = results["local_topic"] == results["expected"]
+    confident = results[results["confident"]]
+
+    logger.info(f"{len(results)} questions, {len(confident)} ({len(confident) / len(results):.0%}) routed locally "
+                f"(threshold {ROUTE_CONFIDENCE_THRESHOLD}), median latency {results['latency_us'].median():.0f}us")
+    logger.info(f"Local accuracy: {results['local_correct'].mean():.0%} overall, "
+                f"{confident['local_correct'].mean():.0%} on questions routed locally")
+    for source, source_results in results.groupby("source"):
+        logger.info(f"{source}: {len(source_results)} questions, accuracy {source_results['local_correct'].mean():.0%}")
+    if args.with_llm:
+        logger.info(f"Routing accuracy (local + LLM fallback): {(results['topic'] == results['expected']).mean():.0%}")
+
+    errors = results[~results["local_correct"]]
+    if not errors.empty:
+        logger.info(f"Local errors:\n{errors[['file', 'query', 'local_topic', 'confidence', 'confident']].to_string()}")
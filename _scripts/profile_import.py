@@ -0,0 +1,56 @@
+import argparse
+import logging
+import statistics
+import subprocess
+import sys
+from typing import List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+DEFAULT_MODULES = [
+    "croptalk.tools",
+    "croptalk.model_openai_functions",
+    "croptalk.model_llm",
+    "main",
+]
+
+
+def measure_import_time(module: str) -> float:
+    """
+    Args:
+        module: module to import, in a fresh interpreter so that nothing is already imported
+
+    Returns:
+        import time of provided module, in seconds
+    """
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def parse_args_profile_import() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "modules",
+        help="modules to profile",
+        nargs="*",
+        default=DEFAULT_MODULES,
+    )
+    parser.add_argument(
+        "--repeat",
+        help="number of imports per module, the median is reported",
+        type=int,
+        default=3,
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # for a per-module breakdown, run: python -X importtime -c "import main" 2> importtime.log
+    args = parse_args_profile_import()
+
+    for module in args.modules:
+        timings: List[float] = [measure_import_time(module) for _ in range(args.repeat)]
+        logger.info(f"{module}: median {statistics.median(timings):.2f}s "
+                    f"(min {min(timings):.2f}s, max {max(timings):.2f}s, {args.repeat} runs)")
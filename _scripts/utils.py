@@ -13,6 +13,11 @@ def parse_args() -> argparse.Namespace:
         help="Option which, when specified, tells the evaluation to use model_llm (i.e. use model_openai_functions when this option is not specified)",
         action='store_true',
     )
+    parser.add_argument(
+        "--retrieval-only",
+        help="Option which, when specified, tells the evaluation to run the document retriever alone, using expected filters (only applies to document retrieval evaluation)",
+        action='store_true',
+    )
     parser.add_argument(
         "eval_path",
         help="CSV file path that contains evaluation use cases",
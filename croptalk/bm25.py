@@ -0,0 +1,82 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+STOP_WORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "which", "who",
+    "will", "with", "my", "me", "do", "does", "can", "there", "their",
+])
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Args:
+        text: text to tokenize
+
+    Returns:
+        lower-cased alphanumeric tokens of provided text, without stop words
+    """
+    return [token for token in re.findall(r"\w+", text.lower()) if token not in STOP_WORDS]
+
+
+class BM25:
+    """
+    Okapi BM25 lexical scorer over a small, in-memory corpus (e.g. the passages of a document).
+    """
+
+    def __init__(self, corpus: List[str], k1: float = 1.5, b: float = 0.75) -> None:
+        """
+        Args:
+            corpus: documents to score
+            k1: term frequency saturation parameter
+            b: document length normalization parameter
+        """
+        self.k1 = k1
+        self.b = b
+        self._term_frequencies = [Counter(tokenize(document)) for document in corpus]
+        self._lengths = [sum(frequencies.values()) for frequencies in self._term_frequencies]
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0
+
+        document_frequencies = Counter()
+        for frequencies in self._term_frequencies:
+            document_frequencies.update(frequencies.keys())
+        nb_documents = len(corpus)
+        self._idf = {
+            term: math.log(1 + (nb_documents - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def get_scores(self, query: str) -> List[float]:
+        """
+        Args:
+            query: query to score corpus against
+
+        Returns:
+            BM25 score of each document of the corpus, in corpus order
+        """
+        query_terms = [term for term in set(tokenize(query)) if term in self._idf]
+        scores = []
+        for frequencies, length in zip(self._term_frequencies, self._lengths):
+            score = 0.0
+            length_norm = self.k1 * (1 - self.b + self.b * length / self._average_length) if self._average_length else 0
+            for term in query_terms:
+                frequency = frequencies.get(term, 0)
+                if frequency:
+                    score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + length_norm)
+            scores.append(score)
+        return scores
+
+    def get_top_n(self, query: str, n: int) -> List[int]:
+        """
+        Args:
+            query: query to score corpus against
+            n: number of documents to return
+
+        Returns:
+            indices of the n best scoring documents with a positive score, best first
+        """
+        scores = self.get_scores(query)
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        return [i for i in ranked[:n] if scores[i] > 0]
@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+
+class TTLCache:
+    """
+    Bounded in-process cache with time-to-live expiration and least-recently-used eviction.
+
+    The cache is thread safe, so a single instance can be shared by the worker threads LangServe
+    uses to run sync chains.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl: Optional[float] = 3600,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            max_size: maximum number of entries kept, least recently used entries are evicted first
+            ttl: number of seconds an entry stays valid, None means entries never expire
+            timer: function returning the current time in seconds, mostly useful for testing
+        """
+        if max_size <= 0:
+            raise ValueError(f"max_size must be strictly positive. Received: {max_size}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._timer = timer
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Args:
+            key: key to look up
+            default: value returned when key is missing or expired
+
+        Returns:
+            cached value matching provided key, or provided default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self._timer():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Args:
+            key: key to store value under
+            value: value to cache
+        """
+        expires_at = None if self.ttl is None else self._timer() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Args:
+            key: key to drop from cache, None means the whole cache is cleared
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            cache counters, useful for logging and monitoring
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PersistentTTLCache:
+    """
+    On-disk cache with time-to-live expiration, stored in a SQLite database file, so that entries
+    survive restarts and are shared by the processes of a host. Keys are strings and values must be
+    JSON serializable.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = 30 * 24 * 3600,
+        timer: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            path: SQLite database file, created if needed
+            ttl: number of seconds an entry stays valid, None means entries never expire
+            timer: function returning the current (wall clock) time in seconds, mostly useful for testing
+        """
+        self.path = path
+        self.ttl = ttl
+        self._timer = timer
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Args:
+            key: key to look up
+            default: value returned when key is missing or expired
+
+        Returns:
+            cached value matching provided key, or provided default
+        """
+        with self._connect() as connection:
+            row = connection.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= self._timer()):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Args:
+            key: key to store value under
+            value: value to cache
+        """
+        expires_at = None if self.ttl is None else self._timer() + self.ttl
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        Args:
+            key: key to drop from cache, None means the whole cache is cleared
+        """
+        with self._connect() as connection:
+            if key is None:
+                connection.execute("DELETE FROM cache")
+            else:
+                connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            cache counters, useful for logging and monitoring
+        """
+        with self._connect() as connection:
+            size = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {"size": size, "hits": self.hits, "misses": self.misses}
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # one connection per operation, connections cannot be shared across threads
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
@@ -1,10 +1,6 @@
 from typing import Callable, Dict
 
-from dsmain.dataapi.lookups import CommodityLookup, StateLookup, CountyLookup, InsurancePlanLookup
-
-state_lookup = StateLookup(quiet_fail=True)
-county_lookup = CountyLookup(quiet_fail=True)
-commodity_lookup = CommodityLookup(quiet_fail=True)
+from croptalk.filter_utils import resolve_filter_codes
 
 
 def create_chroma_filter(state: str = None, county: str = None, commodity: str = None, doc_category: str = None,
@@ -13,9 +9,6 @@ def create_chroma_filter(state: str = None, county: str = None, commodity: str =
     See syntax documentation here: https://docs.trychroma.com/usage-guide#using-where-filters
     """
 
-    def is_valid_param(param):
-        return param and param.lower() != 'none'
-
     def add_filter_condition(field, code):
         if include_common_docs:
             common_code = '00' if field != 'commodity' else '0000'
@@ -27,20 +20,21 @@ def create_chroma_filter(state: str = None, county: str = None, commodity: str =
 
     where_filter = {"$and": []}
 
-    if is_valid_param(state):
-        state_obj = state_lookup.find(state)
-        if state_obj:
-            add_filter_condition("state", state_obj.code)
+    # name to code resolution is cached and shared with weaviate filter creation
+    codes = resolve_filter_codes(
+        state=state or None,
+        county=county or None,
+        commodity=commodity or None,
+    )
+
+    if codes.state:
+        add_filter_condition("state", codes.state)
 
-    if is_valid_param(county) and state:
-        county_obj = county_lookup.find_by_name(county, state)
-        if county_obj:
-            add_filter_condition("county", county_obj.code)
+    if codes.county:
+        add_filter_condition("county", codes.county)
 
-    if is_valid_param(commodity):
-        commodity_obj = commodity_lookup.find(commodity)
-        if commodity_obj:
-            add_filter_condition("commodity", commodity_obj.code)
+    if codes.commodity:
+        add_filter_condition("commodity", codes.commodity)
 
     if doc_category is not None:
         where_filter["$and"].append({"doc_category": {"$eq": doc_category}})
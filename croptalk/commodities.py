@@ -0,0 +1,74 @@
+from typing import Optional, Tuple
+
+from croptalk.fuzzy_matcher import TrigramMatcher
+
+COMMODITY_LIST = ['Wheat', 'Pecans', 'Cotton', 'Peaches', 'Corn', 'Peanuts', 'Whole Farm Revenue Protection',
+                  'Soybeans', 'Pasture,Rangeland,Forage', 'Sesame', 'Controlled Environment', 'Apiculture', 'Hemp',
+                  'Micro Farm', 'Blueberries', 'Oats', 'Fresh Market Sweet Corn', 'Grain Sorghum', 'Potatoes',
+                  'Oysters', 'Triticale', 'Cucumbers', 'Canola', 'Popcorn', 'Fresh Market Tomatoes', 'Feeder Cattle',
+                  'Fed Cattle', 'Cattle', 'Weaned Calves', 'Swine', 'Milk', 'Dairy Cattle', 'Forage Production',
+                  'Dry Peas', 'Barley', 'Cabbage', 'Onions', 'Cotton Ex Long Staple', 'Chile Peppers', 'Dry Beans',
+                  'Apples', 'Pistachios', 'Grapefruit', 'Lemons', 'Tangelos', 'Oranges', 'Mandarins/Tangerines', 'Rice',
+                  'Hybrid Seed Rice', 'Grapes', 'Forage Seeding', 'Walnuts', 'Almonds', 'Prunes', 'Safflower',
+                  'Cherries', 'Processing Cling Peaches', 'Kiwifruit', 'Olives', 'Tomatoes', 'Fresh Apricots',
+                  'Processing Apricots', 'Pears', 'Raisins', 'Table Grapes', 'Figs', 'Plums', 'Alfalfa Seed',
+                  'Strawberries', 'Tangelo Trees', 'Orange Trees', 'Grapefruit Trees', 'Lemon Trees',
+                  'Fresh Nectarines', 'Processing Freestone', 'Fresh Freestone Peaches', 'Mandarin/Tangerine Trees',
+                  'Pomegranates', 'Sugar Beets', 'Grapevine', 'Cultivated Wild Rice', 'Mint', 'Avocados', 'Caneberries',
+                  'Millet', 'Sunflowers', 'Annual Forage', 'Nursery (NVS)', 'Silage Sorghum', 'Hybrid Sweet Corn Seed',
+                  'Cigar Binder Tobacco', 'Cigar Wrapper Tobacco', 'Sweet Corn', 'Processing Beans', 'Green Peas',
+                  'Flue Cured Tobacco', 'Tangors', 'Peppers', 'Sugarcane', 'Macadamia Nuts', 'Macadamia Trees',
+                  'Banana', 'Coffee', 'Papaya', 'Banana Tree', 'Coffee Tree', 'Papaya Tree', 'Hybrid Popcorn Seed',
+                  'Mustard', 'Grass Seed', 'Flax', 'Hybrid Corn Seed', 'Pumpkins', 'Burley Tobacco',
+                  'Hybrid Sorghum Seed', 'Camelina', 'Dark Air Tobacco', 'Fire Cured Tobacco', 'Sweet Potatoes',
+                  'Maryland Tobacco', 'Cranberries', 'Clams', 'Buckwheat', 'Rye', 'Fresh Market Beans', 'Clary Sage',
+                  'Hybrid Vegetable Seed', 'Cigar Filler Tobacco', 'Tangerine Trees', 'Lime Trees']
+
+# common alternative names of commodities, mapped to their official name
+COMMODITY_ALIASES = {
+    'WFRP': 'Whole Farm Revenue Protection',
+    'Whole Farm': 'Whole Farm Revenue Protection',
+    'PRF': 'Pasture,Rangeland,Forage',
+    'Pasture': 'Pasture,Rangeland,Forage',
+    'Rangeland': 'Pasture,Rangeland,Forage',
+    'Soy': 'Soybeans',
+    'Sorghum': 'Grain Sorghum',
+    'Milo': 'Grain Sorghum',
+    'Bees': 'Apiculture',
+    'Honey': 'Apiculture',
+    'Mandarins': 'Mandarins/Tangerines',
+    'Tangerines': 'Mandarins/Tangerines',
+    'Nectarines': 'Fresh Nectarines',
+    'Apricots': 'Fresh Apricots',
+    'Macadamia': 'Macadamia Nuts',
+    'Kiwi': 'Kiwifruit',
+    'Dairy': 'Milk',
+    'Nursery': 'Nursery (NVS)',
+    'ELS Cotton': 'Cotton Ex Long Staple',
+    'Pima Cotton': 'Cotton Ex Long Staple',
+    'Wild Rice': 'Cultivated Wild Rice',
+    'Blackberries': 'Caneberries',
+    'Raspberries': 'Caneberries',
+}
+
+commodity_matcher = TrigramMatcher(
+    choices={
+        **{commodity: commodity for commodity in COMMODITY_LIST},
+        **COMMODITY_ALIASES,
+    },
+    threshold=0.85,
+)
+
+
+def find_commodity_in_text(text: str) -> Optional[Tuple[str, float]]:
+    """
+    Cheap local alternative to LLM commodity extraction, only returns confident matches.
+
+    Args:
+        text: free text, e.g. a user question
+
+    Returns:
+        official name of the commodity mentioned in provided text along with the match score, None
+        if no commodity is confidently found
+    """
+    return commodity_matcher.extract(text)
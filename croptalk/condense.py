@@ -0,0 +1,102 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Optional
+
+from croptalk.cache import TTLCache
+from croptalk.entity_extractor import extract_entities_locally
+
+# words referring to a previous turn, and openings continuing it ("and for corn?", "what about Iowa?").
+# "it", "this", "that", "these" and "those" only refer to it when standing alone ("is it covered for this?"),
+# not in "is it possible" or "is this policy available"
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(its|they|them|their|theirs|above|previous|former|latter)\b"
+    r"|\b(it|this|that|these|those)\b(?!\s+\w)"
+    r"|\bthe same\b(?!\s+as\b)"
+    r"|^\W*(and|or|but|also|same|what about|how about)\b",
+    re.IGNORECASE,
+)
+
+# shorter questions are most likely elliptical ("almonds?" right after a question about apples)
+MIN_STANDALONE_WORDS = 4
+
+# entities a follow-up question may omit, counting on the previous turn
+ENTITY_FIELDS = ("commodity", "state", "county")
+
+# (history hash, question) -> standalone question
+condensed_question_cache = TTLCache(max_size=1024, ttl=float(os.getenv("CONDENSE_CACHE_TTL", 3600)))
+
+# outcomes of question condensing
+STANDALONE = "standalone"
+CACHED = "cached"
+REPHRASED = "rephrased"
+
+
+class CondenseMetrics:
+    """
+    Thread safe counters of the questions asked with a chat history, by outcome: left as is because
+    they are standalone, found in cache, or rephrased by the LLM.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts = {STANDALONE: 0, CACHED: 0, REPHRASED: 0}
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            counters, along with the number of rephrase LLM calls avoided, useful for logging and monitoring
+        """
+        with self._lock:
+            return dict(self.counts, avoided=self.counts[STANDALONE] + self.counts[CACHED])
+
+
+condense_metrics = CondenseMetrics()
+
+
+def get_history_hash(chat_history: str) -> str:
+    """
+    Args:
+        chat_history: formatted chat history
+
+    Returns:
+        hash of provided chat history, used as cache key
+    """
+    return hashlib.sha256(chat_history.encode()).hexdigest()
+
+
+def is_follow_up(question: str, last_question: Optional[str]) -> bool:
+    """
+    Cheap local check of whether a question needs the chat history to be understood. It errs on the side
+    of follow-ups, which are rephrased by the LLM.
+
+    Args:
+        question: user question
+        last_question: previous user question, if any
+
+    Returns:
+        False if provided question is self-contained, i.e. does not refer to the previous turn and mentions
+        (again) every commodity, state or county the previous question mentioned
+    """
+    if FOLLOW_UP_PATTERN.search(question) or len(re.findall(r"\w+", question)) < MIN_STANDALONE_WORDS:
+        return True
+    if last_question is None:
+        return False
+
+    last_entities = extract_entities_locally(last_question)
+    if last_entities is None:
+        # gazetteers could not be loaded
+        return True
+    last_fields = [field for field in ENTITY_FIELDS if getattr(last_entities, field) is not None]
+    if not last_fields:
+        return False
+
+    entities = extract_entities_locally(question)
+    if entities is None:
+        return True
+    return any(getattr(entities, field) is None for field in last_fields)
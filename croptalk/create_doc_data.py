@@ -1,18 +1,191 @@
 import argparse
+import io
 import os
+from typing import Dict, Iterable, Iterator, List, Optional
 
 import pandas as pd
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from pandas.api.types import union_categoricals
+from sqlalchemy import BigInteger, Float, Integer, Numeric, SmallInteger, String, create_engine, inspect, text
 
+# low cardinality name columns, stored as categoricals
+CATEGORICAL_COLUMNS = [
+    "state_name",
+    "state_abbreviation",
+    "county_name",
+    "commodity_name",
+    "insurance_plan_name_abbreviation",
+]
+
+
+def query_sql_data_iter(query: str,
+                        chunk_size: int = 50_000,
+                        categorical_columns: Optional[List[str]] = None,
+                        dtypes: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Streams the result of a SQL query through a server-side cursor, so that only one chunk of rows is
+    held in memory at a time.
+
+    Args:
+        query: SQL query
+        chunk_size: number of rows per chunk
+        categorical_columns: columns converted to categoricals, defaults to CATEGORICAL_COLUMNS
+        dtypes: dtype of each column, e.g. from get_table_dtypes, so that every chunk has the same
+                dtypes. Otherwise, integer columns of each chunk are downcast to the smallest integer
+                type fitting that chunk, floats are kept as is since amounts do not fit float32 precision
+
+    Returns:
+        chunks of the query result, a single empty DataFrame if the query returns no row
+    """
+    if categorical_columns is None:
+        categorical_columns = CATEGORICAL_COLUMNS
 
-def query_sql_data(query):
-    # Execute the SQL query
     with engine.connect() as connection:
-        result = connection.execute(text(query))
-        rows = result.fetchall()
+        result = connection.execution_options(yield_per=chunk_size).execute(text(query))
+        columns = list(result.keys())
+        empty = True
+        # without a size, partitions() falls back to fetchmany() defaults, which depend on the driver
+        # (a single row, or the whole result at once)
+        for rows in result.partitions(chunk_size):
+            empty = False
+            yield optimize_dtypes(pd.DataFrame(data=rows, columns=columns), categorical_columns, dtypes)
+
+    if empty:
+        yield pd.DataFrame(columns=columns)
+
+
+def get_table_dtypes(table_name: str) -> Dict[str, str]:
+    """
+    Args:
+        table_name: database table
+
+    Returns:
+        pandas dtype of the integer, float and text columns of provided table, from its schema. Integer
+        dtypes are nullable so that NULLs do not turn them into floats
+    """
+    dtypes = {}
+    for column in inspect(engine).get_columns(table_name):
+        column_type = column["type"]
+        if isinstance(column_type, SmallInteger):
+            dtypes[column["name"]] = "Int16"
+        elif isinstance(column_type, BigInteger):
+            dtypes[column["name"]] = "Int64"
+        elif isinstance(column_type, Integer):
+            dtypes[column["name"]] = "Int32"
+        elif isinstance(column_type, (Float, Numeric)):
+            dtypes[column["name"]] = "float64"
+        elif isinstance(column_type, String):
+            dtypes[column["name"]] = "string"
+    return dtypes
+
+
+def optimize_dtypes(df: pd.DataFrame,
+                    categorical_columns: List[str],
+                    dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Args:
+        df: data frame to convert, in place
+        categorical_columns: columns converted to categoricals, if present
+        dtypes: dtype of each column, integer columns are downcast when not provided
+
+    Returns:
+        provided data frame, with categorical and fixed (or downcast) integer columns
+    """
+    for column in df.columns:
+        if column in categorical_columns:
+            df[column] = df[column].astype("category")
+        elif dtypes is not None:
+            if column in dtypes:
+                df[column] = df[column].astype(dtypes[column])
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+    return df
+
+
+def concat_chunks(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates column by column: each chunk is split into columns as it arrives, and the parts of a
+    column are released as soon as they are concatenated, so that peak memory is about the size of the
+    result plus one column, rather than twice the size of the result.
+
+    Args:
+        chunks: data frames with the same columns, e.g. from query_sql_data_iter
+
+    Returns:
+        concatenated data frame, categorical columns stay categoricals even if chunks have different
+        categories
+    """
+    parts: Dict[str, List[pd.Series]] = {}
+    for chunk in chunks:
+        for column in chunk.columns:
+            # copied, so that the chunk (and the blocks it shares between columns) is released
+            parts.setdefault(column, []).append(chunk[column].copy())
+    chunk = None
+
+    df = None
+    for column in list(parts):
+        column_parts = parts.pop(column)
+        if isinstance(column_parts[0].dtype, pd.CategoricalDtype):
+            values = pd.Series(union_categoricals(column_parts))
+        else:
+            values = pd.concat(column_parts, ignore_index=True)
+        del column_parts
+        if df is None:
+            df = pd.DataFrame(index=values.index)
+        # inserted one at a time, building the frame from all columns at once would copy them together
+        df[column] = values
+        del values
+    return df if df is not None else pd.DataFrame()
+
+
+def query_sql_data(query: str, categorical_columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Args:
+        query: SQL query
+        categorical_columns: columns converted to categoricals, none by default
+
+    Returns:
+        query result
+    """
+    return concat_chunks(query_sql_data_iter(query, categorical_columns=categorical_columns or []))
+
+
+def copy_to_table(df: pd.DataFrame,
+                  table_name: str,
+                  chunk_size: int = 100_000,
+                  index_columns: Optional[List[str]] = None) -> None:
+    """
+    Replaces a Postgres table with provided data, through COPY. Data is loaded into a staging table
+    which is then renamed, in a single transaction, so that readers never see a partially written
+    table.
+
+    Args:
+        df: data to load
+        table_name: table to replace
+        chunk_size: number of rows sent per COPY statement
+        index_columns: columns of an index created on the table, within the same transaction
+    """
+    staging_table = f"{table_name}_staging"
+    columns = ", ".join(f'"{column}"' for column in df.columns)
+
+    with engine.begin() as connection:
+        # let pandas create the staging table with the right column types, without any row
+        df.head(0).to_sql(staging_table, connection, if_exists="replace", index=False)
+
+        cursor = connection.connection.cursor()
+        for start in range(0, len(df), chunk_size):
+            buffer = io.StringIO()
+            df.iloc[start:start + chunk_size].to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(f'COPY "{staging_table}" ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
 
-    return pd.DataFrame(data=rows)
+        connection.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+        connection.execute(text(f'ALTER TABLE "{staging_table}" RENAME TO "{table_name}"'))
+        if index_columns:
+            connection.execute(text(
+                f'CREATE INDEX IF NOT EXISTS "{table_name}_{"_".join(index_columns)}_idx" '
+                f'ON "{table_name}" ({", ".join(index_columns)})'
+            ))
 
 
 load_dotenv("secrets/.env.secret")
@@ -45,39 +218,36 @@ if __name__ == '__main__':
         sp_files = chunks[(chunks["doc_category"] == "SP") &
                           (chunks["year"] == 2024)].drop_duplicates("s3_key")
 
-        sp_files.to_sql("sp_files_raw",
-                        engine,
-                        if_exists='replace',
-                        index=False)
+        copy_to_table(sp_files, "sp_files_raw")
 
     sp_files = query_sql_data("SELECT * FROM sp_files_raw")
 
     # renaming and preprocessing to make sure of merge compatibility
     sp_files = sp_files.rename(columns={"state": "state_code", "county": "county_code", "commodity": "commodity_code"})
-    sp_files["state_code"] = sp_files["state_code"].apply(lambda x: str(x).zfill(2))
-    sp_files["county_code"] = sp_files["county_code"].apply(lambda x: str(x).zfill(3))
-    sp_files["commodity_code"] = sp_files["commodity_code"].apply(lambda x: str(x).zfill(4))
+    sp_files["state_code"] = sp_files["state_code"].astype(str).str.zfill(2)
+    sp_files["county_code"] = sp_files["county_code"].astype(str).str.zfill(3)
+    sp_files["commodity_code"] = sp_files["commodity_code"].astype(str).str.zfill(4)
 
     # get state data
     state = query_sql_data(query="""
         SELECT "State Code" as state_code, "State Name" as state_name
         FROM state
         """)
-    state["state_name"] = state["state_name"].apply(lambda x: x.lower())
+    state["state_name"] = state["state_name"].str.lower()
 
     # get county data
     county = query_sql_data(query="""
         SELECT "State Code" as state_code, "County Code" as county_code, "County Name" as county_name
         FROM county
         """)
-    county["county_name"] = county["county_name"].apply(lambda x: x.lower())
+    county["county_name"] = county["county_name"].str.lower()
 
     # get commodity data
     commodity = query_sql_data(query="""
         SELECT "Commodity Code" as commodity_code, "Commodity Name" as commodity_name
         FROM commodity
         """)
-    commodity["commodity_name"] = commodity["commodity_name"].apply(lambda x: x.lower())
+    commodity["commodity_name"] = commodity["commodity_name"].str.lower()
 
     # merge sp_files with names for state, county and commodity
     sp_files = pd.merge(sp_files, state, on="state_code")
@@ -89,7 +259,4 @@ if __name__ == '__main__':
     cols_to_include = ['title', 'content', 'commodity_name', 'state_name', 'county_name', 'doc_category', 'year',
                        's3_key']
 
-    sp_files[cols_to_include].to_sql(table_name,
-                                     engine,
-                                     if_exists='replace',
-                                     index=False)
+    copy_to_table(sp_files[cols_to_include], table_name)
@@ -0,0 +1,84 @@
+import argparse
+import logging
+import os
+import shutil
+
+from croptalk.create_doc_data import get_table_dtypes, query_sql_data_iter
+from croptalk.sob_database import SOB_PARTITION_COLUMNS, SOB_TABLE, register_sob_parquet
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+
+def export_sob_parquet(output_dir: str, min_year: int) -> int:
+    """
+    Writes sob_all_years table to Parquet files partitioned by commodity_year and state, rows being
+    streamed from Postgres in chunks to bound memory usage. Requires pyarrow.
+
+    Args:
+        output_dir: directory of the Parquet dataset, replaced once the export is complete
+        min_year: first commodity year to export
+
+    Returns:
+        number of exported rows
+    """
+    # export into a temporary directory so that readers never see a partial dataset
+    tmp_dir = output_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    import pyarrow as pa
+
+    nb_rows = 0
+    schema = None
+    # sorted on partition columns so that each chunk only writes to a few partitions. Dtypes come from the
+    # table schema and names are kept as strings (not per-chunk categoricals), so that every file of the
+    # dataset has the same schema
+    for sob in query_sql_data_iter(f"""
+            SELECT * FROM {SOB_TABLE}
+            WHERE commodity_year >= {int(min_year)}
+            ORDER BY {", ".join(SOB_PARTITION_COLUMNS)}
+            """, categorical_columns=[], dtypes=get_table_dtypes(SOB_TABLE)):
+        if sob.empty:
+            continue
+        if schema is None:
+            schema = pa.Schema.from_pandas(sob, preserve_index=False)
+        sob.to_parquet(tmp_dir, partition_cols=SOB_PARTITION_COLUMNS, index=False, schema=schema)
+        nb_rows += len(sob)
+        logger.info(f"Exported {nb_rows} rows")
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.rename(tmp_dir, output_dir)
+    return nb_rows
+
+
+def parse_args_create_sob_parquet() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--output-dir",
+        help="directory of the partitioned Parquet dataset",
+        default=os.getenv("SOB_PARQUET_DIR", "data/sob_parquet"),
+    )
+    parser.add_argument(
+        "--min-year",
+        help="first commodity year to export",
+        type=int,
+        default=2010,
+    )
+    parser.add_argument(
+        "--duckdb-path",
+        help="DuckDB database file in which a sob_all_years view over the Parquet dataset is created",
+        default=os.getenv("SOB_DUCKDB_PATH"),
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args_create_sob_parquet()
+
+    nb_rows = export_sob_parquet(args.output_dir, args.min_year)
+    logger.info(f"Exported {nb_rows} rows of {SOB_TABLE} table to {args.output_dir}")
+
+    if args.duckdb_path:
+        register_sob_parquet(args.duckdb_path, args.output_dir)
+        logger.info(f"Registered {SOB_TABLE} view in {args.duckdb_path}")
@@ -0,0 +1,29 @@
+import logging
+
+from sqlalchemy import text
+
+from croptalk.create_doc_data import engine
+from croptalk.sob_rollups import SOB_ROLLUPS, get_rollup_query
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+
+if __name__ == '__main__':
+    for rollup in SOB_ROLLUPS:
+        new_table = f"{rollup.table}_new"
+
+        # rollup is rebuilt aside then swapped in a single transaction, readers never see it missing
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {new_table}"))
+            connection.execute(text(get_rollup_query(rollup, new_table)))
+            connection.execute(text(f"DROP TABLE IF EXISTS {rollup.table}"))
+            connection.execute(text(f"ALTER TABLE {new_table} RENAME TO {rollup.table}"))
+            for i, columns in enumerate(rollup.indexes):
+                connection.execute(text(
+                    f"CREATE INDEX {rollup.table}_idx_{i} ON {rollup.table} ({', '.join(columns)})"
+                ))
+            connection.execute(text(f"ANALYZE {rollup.table}"))
+            nb_rows = connection.execute(text(f"SELECT COUNT(*) FROM {rollup.table}")).scalar()
+
+        logger.info(f"Materialized {rollup.table} : {nb_rows} rows")
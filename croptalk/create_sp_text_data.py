@@ -0,0 +1,85 @@
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import inspect
+
+from croptalk.create_doc_data import copy_to_table, engine, query_sql_data
+from croptalk.sp_documents import SP_BUCKET, SP_PAGES_TABLE
+from croptalk.utils import extract_pdf_pages, get_s3_client, remove_long_words
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+
+def extract_sp_pages(s3_key: str) -> Optional[pd.DataFrame]:
+    """
+    Args:
+        s3_key: S3 key of SP document
+
+    Returns:
+        cleaned text of each page of SP document (s3_key, page_number, content), None if the
+        document could not be downloaded or parsed
+    """
+    try:
+        response = get_s3_client().get_object(Bucket=SP_BUCKET, Key=s3_key)
+        pages = extract_pdf_pages(response['Body'].read())
+    except Exception as e:
+        logger.warning(f"Skipping {s3_key}: {e}")
+        return None
+
+    return pd.DataFrame({
+        "s3_key": s3_key,
+        "page_number": range(1, len(pages) + 1),
+        "content": [remove_long_words(page) for page in pages],
+    })
+
+
+def parse_args_create_sp_text_data() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--only-missing",
+        help="only extract SP documents that are not already in sp_pages table",
+        action='store_true',
+    )
+    parser.add_argument(
+        "--max-workers",
+        help="number of SP documents downloaded and parsed concurrently",
+        type=int,
+        default=8,
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args_create_sp_text_data()
+
+    # nothing to append to on a first run
+    append = args.only_missing and inspect(engine).has_table(SP_PAGES_TABLE)
+
+    s3_keys = query_sql_data("SELECT DISTINCT s3_key FROM sp_files")["s3_key"].tolist()
+    if append:
+        existing_s3_keys = query_sql_data(f"SELECT DISTINCT s3_key FROM {SP_PAGES_TABLE}")
+        if not existing_s3_keys.empty:
+            s3_keys = sorted(set(s3_keys) - set(existing_s3_keys["s3_key"]))
+    logger.info(f"Extracting text of {len(s3_keys)} SP documents")
+
+    with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+        sp_pages = [pages for pages in executor.map(extract_sp_pages, s3_keys) if pages is not None]
+
+    if not sp_pages:
+        logger.info("No SP document to load")
+    else:
+        sp_pages = pd.concat(sp_pages, ignore_index=True)
+        if append:
+            # single transaction, so that readers never see part of a document
+            with engine.begin() as connection:
+                sp_pages.to_sql(SP_PAGES_TABLE, connection, if_exists='append', index=False,
+                                chunksize=1000, method='multi')
+        else:
+            # built into a staging table which replaces the live one once complete
+            copy_to_table(sp_pages, SP_PAGES_TABLE, index_columns=["s3_key", "page_number"])
+        logger.info(f"Loaded {len(sp_pages)} pages of {sp_pages['s3_key'].nunique()} SP documents into "
+                    f"{SP_PAGES_TABLE} table")
@@ -1,10 +1,16 @@
-from typing import List, Optional
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
+from weaviate.collections.collection import Collection
 from weaviate.collections.classes.internal import QueryReturn
 
+from croptalk.cache import TTLCache
 from croptalk.weaviate_utils import (
+    aquery_near_text_with_filters,
     get_client_collection,
+    query_near_text_batch,
     query_near_text_with_filters,
 )
 
@@ -17,18 +23,56 @@ class DocumentRetriever:
     Class responsible for document retrieval in a weaviate vector store.
     """
 
-    def __init__(self, collection_name: str) -> None:
+    def __init__(
+        self,
+        collection_name: str,
+        cache_size: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+    ) -> None:
         """
         Connecting to weaviate cloud services requires the following environment variables to be
         set:
             - WCS_CLUSTER_URL
             - WCS_API_KEY
 
+        Query results are cached in memory, cache size and time-to-live (in seconds) default to the
+        RETRIEVER_CACHE_SIZE and RETRIEVER_CACHE_TTL environment variables. A cache size of 0
+        disables caching.
+
         Args:
             collection_name: Name of weaviate collection
+            cache_size: maximum number of cached queries, defaults to RETRIEVER_CACHE_SIZE or 256
+            cache_ttl: number of seconds a cached query stays valid, defaults to
+                       RETRIEVER_CACHE_TTL or 3600
         """
         self.collection_name = collection_name
-        self.collection = get_client_collection(self.collection_name)[1]
+        # connection to weaviate is opened on first use (or warm-up), not at instantiation
+        self._collection = None
+        self._collection_lock = threading.Lock()
+
+        if cache_size is None:
+            cache_size = int(os.getenv("RETRIEVER_CACHE_SIZE", 256))
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv("RETRIEVER_CACHE_TTL", 3600))
+        self.cache = TTLCache(max_size=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+
+    @property
+    def collection(self) -> Collection:
+        """
+        Returns:
+            weaviate collection, connecting to weaviate on first call
+        """
+        if self._collection is None:
+            with self._collection_lock:
+                if self._collection is None:
+                    self._collection = get_client_collection(self.collection_name)[1]
+        return self._collection
+
+    def connect(self) -> None:
+        """
+        Opens the connection to weaviate ahead of the first query.
+        """
+        _ = self.collection
 
     def get_documents(
         self,
@@ -58,6 +102,13 @@ class DocumentRetriever:
         if not isinstance(query, str):
             raise ValueError(f"Query must be a string. Received: {query}")
 
+        cache_key = self._get_cache_key(
+            query, doc_category, commodity, county, state, top_k, include_common_docs,
+        )
+        cached_docs = self._get_cached_documents(cache_key)
+        if cached_docs is not None:
+            return cached_docs
+
         # query vector store
         query_response = query_near_text_with_filters(
             collection=self.collection,
@@ -72,8 +123,179 @@ class DocumentRetriever:
 
         # format returned docs
         formatted_docs = self._format_query_response(query_response)
+        self._cache_documents(cache_key, formatted_docs)
         return formatted_docs
 
+    async def aget_documents(
+        self,
+        query: str,
+        doc_category: Optional[str] = None,
+        commodity: Optional[str] = None,
+        county: Optional[str] = None,
+        state: Optional[str] = None,
+        top_k: int = 3,
+        include_common_docs: bool = True,
+    ) -> List[str]:
+        """
+        Asynchronous version of get_documents, sharing the same query cache.
+
+        Args:
+            query: query to use for document retrieval
+            doc_category: document category to filter on, None means no filter
+            commodity: commodity to filter on, None means no filter
+            county: county to filter on, None means no filter
+            state: state to filter on, None means no filter
+            top_k: number of retrieved documents we are aiming for, defaults to 3
+            include_common_docs: whether (default) or not to include documents that apply to all
+                                 states, counties or commodities... does not apply to document
+                                 category filter
+
+        Returns:
+            list of retrieved documents matching query, filters and top_k
+        """
+        if not isinstance(query, str):
+            raise ValueError(f"Query must be a string. Received: {query}")
+
+        cache_key = self._get_cache_key(
+            query, doc_category, commodity, county, state, top_k, include_common_docs,
+        )
+        cached_docs = self._get_cached_documents(cache_key)
+        if cached_docs is not None:
+            return cached_docs
+
+        # query vector store
+        # the collection is resolved in the worker thread, connecting to weaviate would block the loop
+        query_response = await aquery_near_text_with_filters(
+            get_collection=lambda: self.collection,
+            query=query,
+            limit=top_k,
+            doc_category=doc_category,
+            commodity=commodity,
+            county=county,
+            state=state,
+            include_common_docs=include_common_docs,
+        )
+
+        # format returned docs
+        formatted_docs = self._format_query_response(query_response)
+        self._cache_documents(cache_key, formatted_docs)
+        return formatted_docs
+
+    def get_documents_batch(
+        self,
+        specs: List[Tuple[str, Dict[str, Any]]],
+        top_k: int = 3,
+    ) -> List[List[str]]:
+        """
+        Batch version of get_documents, queries that are not cached run concurrently.
+
+        Args:
+            specs: list of (query, filters) tuples, filters being a dict of get_documents keyword
+                   arguments (doc_category, commodity, county, state, include_common_docs)
+            top_k: number of retrieved documents we are aiming for, for each query, defaults to 3
+
+        Returns:
+            list of retrieved documents for each spec, in the same order as provided specs
+        """
+        results: List[Optional[List[str]]] = [None] * len(specs)
+        missing = []
+        for i, (query, filters) in enumerate(specs):
+            if not isinstance(query, str):
+                raise ValueError(f"Query must be a string. Received: {query}")
+            cache_key = self._get_cache_key(
+                query,
+                filters.get("doc_category"),
+                filters.get("commodity"),
+                filters.get("county"),
+                filters.get("state"),
+                top_k,
+                filters.get("include_common_docs", True),
+            )
+            results[i] = self._get_cached_documents(cache_key)
+            if results[i] is None:
+                missing.append((i, cache_key))
+
+        if missing:
+            # query vector store
+            query_responses = query_near_text_batch(
+                collection=self.collection,
+                specs=[specs[i] for i, _ in missing],
+                limit=top_k,
+            )
+
+            # format returned docs
+            for (i, cache_key), query_response in zip(missing, query_responses):
+                results[i] = self._format_query_response(query_response)
+                self._cache_documents(cache_key, results[i])
+
+        return results
+
+    def invalidate_cache(self) -> None:
+        """
+        Drops every cached query result, should be called once the collection has been re-ingested.
+        """
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def cache_stats(self) -> Optional[dict]:
+        """
+        Returns:
+            query cache counters (size, hits, misses, evictions), None if caching is disabled
+        """
+        return self.cache.stats() if self.cache is not None else None
+
+    def _get_cached_documents(self, cache_key: Tuple) -> Optional[List[str]]:
+        """
+        Args:
+            cache_key: normalized get_documents arguments
+
+        Returns:
+            a copy of the cached documents matching provided key, None if there are none
+        """
+        if self.cache is None:
+            return None
+        cached_docs = self.cache.get(cache_key)
+        return list(cached_docs) if cached_docs is not None else None
+
+    def _cache_documents(self, cache_key: Tuple, formatted_docs: List[str]) -> None:
+        """
+        Args:
+            cache_key: normalized get_documents arguments
+            formatted_docs: documents to cache under provided key
+        """
+        if self.cache is not None:
+            self.cache.set(cache_key, tuple(formatted_docs))
+
+    @staticmethod
+    def _get_cache_key(
+        query: str,
+        doc_category: Optional[str],
+        commodity: Optional[str],
+        county: Optional[str],
+        state: Optional[str],
+        top_k: int,
+        include_common_docs: bool,
+    ) -> Tuple:
+        """
+        Returns:
+            normalized cache key for provided get_documents arguments, filter values that weaviate
+            filter considers equivalent (i.e. None and 'None') share the same key
+        """
+        def _normalize(value: Optional[str]) -> Optional[str]:
+            if value is None or value.lower() == "none":
+                return None
+            return value
+
+        return (
+            query,
+            _normalize(doc_category),
+            _normalize(commodity),
+            _normalize(county),
+            _normalize(state),
+            top_k,
+            include_common_docs,
+        )
+
     @staticmethod
     def _format_query_response(query_response: QueryReturn) -> List[str]:
         """
@@ -0,0 +1,181 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+from croptalk.commodities import find_commodity_in_text
+from croptalk.name_index import IndexEntry, NameIndex, get_name_index
+
+logger = logging.getLogger(__name__)
+
+# words announcing a county name, right after it
+COUNTY_CUES = frozenset(["county", "counties", "parish", "borough"])
+
+DOC_CATEGORY_PATTERNS = [
+    ("CIH", re.compile(r"\bCIH\b|crop insurance handbook", re.IGNORECASE)),
+    ("BP", re.compile(r"\bBP\b|basic provisions?\b", re.IGNORECASE)),
+    ("CP", re.compile(r"\bCP\b|crop provisions?\b", re.IGNORECASE)),
+    ("SP", re.compile(r"\bSPs?\b|special provisions?\b", re.IGNORECASE)),
+]
+
+# longest state or county name, in words
+MAX_NAME_WORDS = 4
+
+
+class LocalEntities(NamedTuple):
+    """
+    Retrieval filters found in a question with the local gazetteers, None when not mentioned.
+
+    confident is False when the question seems to mention something the gazetteers could not
+    resolve unambiguously (e.g. a county without a known name, or no known commodity), the LLM should
+    be asked then.
+    """
+    commodity: Optional[str]
+    state: Optional[str]
+    county: Optional[str]
+    doc_category: Optional[str]
+    confident: bool
+
+
+class LocalEntityExtractor:
+    """
+    Rule and dictionary based extractor of commodity, state, county and document category, over the
+    state, county and commodity gazetteers. Only exact names are looked up (fuzzy matching being left
+    to the LLM), state abbreviations must be upper-cased (e.g. "NY", so that "in" is not Indiana).
+    """
+
+    def __init__(self, name_index: NameIndex) -> None:
+        """
+        Args:
+            name_index: state, county and commodity gazetteers
+        """
+        self.name_index = name_index
+
+    def extract(self, text: str) -> LocalEntities:
+        """
+        Args:
+            text: free text, e.g. a user question
+
+        Returns:
+            entities mentioned in provided text
+        """
+        words = re.findall(r"\w+", text)
+        confident = True
+
+        states = self._find_states(words)
+        state_entry, state_span = states[0] if states else (None, None)
+        if len({entry.code for entry, _ in states}) > 1:
+            # several states, or a county named after a state (e.g. Washington county)
+            confident = False
+
+        county_entry = None
+        if state_entry is not None:
+            county_entry, county_confident = self._find_county(words, state_entry, state_span)
+            confident = confident and county_confident
+        if county_entry is None and any(word.lower() in COUNTY_CUES for word in words):
+            confident = False
+
+        commodity_match = find_commodity_in_text(text)
+        if commodity_match is None:
+            # the commodity may be named in a way the gazetteer does not know (typo, variety...)
+            confident = False
+        doc_category = next(
+            (category for category, pattern in DOC_CATEGORY_PATTERNS if pattern.search(text)), None
+        )
+
+        return LocalEntities(
+            commodity=commodity_match[0] if commodity_match is not None else None,
+            state=state_entry.name if state_entry is not None else None,
+            county=county_entry.name if county_entry is not None else None,
+            doc_category=doc_category,
+            confident=confident,
+        )
+
+    def _find_states(self, words: List[str]) -> List[Tuple[IndexEntry, Tuple[int, int]]]:
+        """
+        Returns:
+            states found in words along with their (start, end) word span, longest names first
+        """
+        states = []
+        for start, end in self._iter_spans(words):
+            if end - start == 1 and len(words[start]) == 2 and not words[start].isupper():
+                # lower-cased 2 letter words are not state abbreviations
+                continue
+            if any(start < taken_end and taken_start < end for _, (taken_start, taken_end) in states):
+                continue
+            entry = self.name_index.find_state(" ".join(words[start:end]), fuzzy=False)
+            if entry is not None:
+                states.append((entry, (start, end)))
+        return states
+
+    def _find_county(
+        self,
+        words: List[str],
+        state_entry: IndexEntry,
+        state_span: Tuple[int, int],
+    ) -> Tuple[Optional[IndexEntry], bool]:
+        """
+        Returns:
+            county of provided state found in words, and whether it was found confidently, i.e. followed
+            by a county cue ("Yakima county") or next to the state name ("Baldwin, Alabama")
+        """
+        candidates = []
+        for start, end in self._iter_spans(words):
+            if start < state_span[1] and state_span[0] < end:
+                continue
+            entry = self.name_index.find_county(" ".join(words[start:end]), state_entry.code, fuzzy=False)
+            if entry is None:
+                continue
+            followed_by_cue = end < len(words) and words[end].lower() in COUNTY_CUES
+            next_to_state = end == state_span[0] or start == state_span[1]
+            if followed_by_cue or next_to_state:
+                return entry, True
+            candidates.append(entry)
+
+        if candidates:
+            return candidates[0], False
+        return None, True
+
+    @staticmethod
+    def _iter_spans(words: List[str]):
+        # longest spans first, so that "West Virginia" wins over "Virginia"
+        for length in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - length + 1):
+                yield start, start + length
+
+
+# seconds to wait before loading the gazetteers again after a failure
+GAZETTEERS_RETRY_DELAY = float(os.getenv("GAZETTEERS_RETRY_DELAY", 60))
+
+_local_entity_extractor: Optional[LocalEntityExtractor] = None
+_local_entity_extractor_failed_at: Optional[float] = None
+_local_entity_extractor_lock = threading.Lock()
+
+
+def extract_entities_locally(text: str) -> Optional[LocalEntities]:
+    """
+    Args:
+        text: free text, e.g. a user question
+
+    Returns:
+        entities mentioned in provided text, None if the gazetteers could not be loaded (loading is
+        only retried GAZETTEERS_RETRY_DELAY seconds after a failure)
+    """
+    global _local_entity_extractor, _local_entity_extractor_failed_at
+    if _local_entity_extractor is None:
+        if (_local_entity_extractor_failed_at is not None
+                and time.monotonic() - _local_entity_extractor_failed_at < GAZETTEERS_RETRY_DELAY):
+            return None
+        with _local_entity_extractor_lock:
+            if _local_entity_extractor is None:
+                try:
+                    _local_entity_extractor = LocalEntityExtractor(get_name_index())
+                    _local_entity_extractor_failed_at = None
+                except Exception as e:
+                    # e.g. database down or not configured, the LLM extracts entities meanwhile
+                    logger.warning(f"Unable to load gazetteers, entities are extracted by LLM : {e}")
+                    _local_entity_extractor_failed_at = time.monotonic()
+                    return None
+    return _local_entity_extractor.extract(text)
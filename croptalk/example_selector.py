@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Dict, List
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+from langchain_core.example_selectors import SemanticSimilarityExampleSelector
+from langchain_core.example_selectors.semantic_similarity import sorted_values
+
+logger = logging.getLogger(__name__)
+
+
+def get_examples_hash(examples: List[Dict], embeddings: Embeddings) -> str:
+    """
+    Args:
+        examples: few-shot examples
+        embeddings: embedding model of the examples
+
+    Returns:
+        hash of the examples and of the embedding model, any change requires examples to be embedded again
+    """
+    content = json.dumps({
+        "examples": examples,
+        "embeddings": getattr(embeddings, "model", type(embeddings).__name__),
+    }, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def load_example_selector(examples: List[Dict],
+                          embeddings: Embeddings,
+                          index_dir: str,
+                          k: int = 5,
+                          input_keys: List[str] = None) -> SemanticSimilarityExampleSelector:
+    """
+    Same as SemanticSimilarityExampleSelector.from_examples with a FAISS vectorstore, except that the
+    FAISS index is persisted on disk, in a sub-directory named after the hash of the examples. Examples
+    are only embedded when they (or the embedding model) change, otherwise the index is loaded locally.
+
+    Args:
+        examples: few-shot examples
+        embeddings: embedding model of the examples
+        index_dir: directory FAISS indexes are persisted to
+        k: number of examples to select
+        input_keys: example keys to embed, defaults to all keys
+
+    Returns:
+        example selector
+    """
+    index_path = os.path.join(index_dir, get_examples_hash(examples, embeddings))
+
+    if os.path.exists(os.path.join(index_path, "index.faiss")):
+        # index was written by this function, its pickled docstore can be trusted
+        vectorstore = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+        logger.info(f"Loaded few-shot examples index from {index_path}")
+    else:
+        if input_keys:
+            string_examples = [" ".join(sorted_values({key: example[key] for key in input_keys}))
+                               for example in examples]
+        else:
+            string_examples = [" ".join(sorted_values(example)) for example in examples]
+        vectorstore = FAISS.from_texts(string_examples, embeddings, metadatas=examples)
+
+        # write to a temporary directory first so that concurrent processes never load a partial index
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        vectorstore.save_local(tmp_path)
+        try:
+            os.rename(tmp_path, index_path)
+            logger.info(f"Saved few-shot examples index to {index_path}")
+        except OSError:
+            # index was saved by another process in the meantime
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    return SemanticSimilarityExampleSelector(vectorstore=vectorstore, k=k, input_keys=input_keys)
@@ -0,0 +1,160 @@
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+from croptalk.cache import TTLCache
+from croptalk.name_index import get_name_index
+
+logger = logging.getLogger(__name__)
+
+# state, county and commodity codes do not change within the lifetime of the app, hence no TTL
+codes_cache = TTLCache(max_size=4096, ttl=None)
+
+# number of filter values that could not be resolved to a code, by field
+lookup_misses = Counter()
+
+_fallback_lookups: Optional[Tuple[Any, Any, Any]] = None
+_fallback_lookups_lock = threading.Lock()
+
+
+class FilterCodes(NamedTuple):
+    """
+    Lookup codes (0-padded strings) of filter values, None means no filter.
+    """
+    state: Optional[str] = None
+    county: Optional[str] = None
+    commodity: Optional[str] = None
+
+
+def is_valid_filter_value(value: Optional[str]) -> bool:
+    """
+    Args:
+        value: filter value, as extracted from user query
+
+    Returns:
+        whether or not provided value should be used as filter ('None' is a common LLM output)
+    """
+    return value is not None and value.lower() != "none"
+
+
+def normalize_filter_value(value: Optional[str]) -> Optional[str]:
+    """
+    Args:
+        value: filter value, as extracted from user query
+
+    Returns:
+        provided value if it is a valid filter value, None otherwise
+    """
+    return value if is_valid_filter_value(value) else None
+
+
+def resolve_filter_codes(
+    state: Optional[str] = None,
+    county: Optional[str] = None,
+    commodity: Optional[str] = None,
+) -> FilterCodes:
+    """
+    Resolves state, county and commodity names to their lookup codes, through the in-memory name
+    index, or through dsmain lookups while the index cannot be loaded. Resolutions are cached, so that
+    filter builders (weaviate, chroma) do not repeat work.
+
+    Args:
+        state: state to filter on, None means no filter
+        county: county to filter on, None means no filter, only considered if state is provided
+        commodity: commodity to filter on, None means no filter
+
+    Returns:
+        codes of provided state, county and commodity, None when not provided or not found
+    """
+    key = (
+        normalize_filter_value(state),
+        normalize_filter_value(county),
+        normalize_filter_value(commodity),
+    )
+    codes = codes_cache.get(key)
+    if codes is None:
+        codes, index_available = _resolve_filter_codes(*key)
+        # do not cache resolutions made while the name index was unavailable
+        if index_available:
+            codes_cache.set(key, codes)
+    return codes
+
+
+def get_filter_cache_stats() -> dict:
+    """
+    Returns:
+        codes cache counters and lookup misses by field
+    """
+    return {
+        **codes_cache.stats(),
+        "lookup_misses": dict(lookup_misses),
+    }
+
+
+def get_fallback_lookups() -> Tuple[Any, Any, Any]:
+    """
+    Returns:
+        dsmain state, county and commodity lookups, querying the lookup API on each call, used when the
+        name index cannot be loaded
+
+    Raises:
+        RuntimeError: if dsmain is not installed, as filters could not be resolved at all
+    """
+    global _fallback_lookups
+    if _fallback_lookups is None:
+        with _fallback_lookups_lock:
+            if _fallback_lookups is None:
+                try:
+                    from dsmain.dataapi.lookups import CommodityLookup, CountyLookup, StateLookup
+                except ImportError as e:
+                    raise RuntimeError("Name index unavailable and dsmain lookups not installed, "
+                                       "state, county and commodity filters cannot be resolved") from e
+                _fallback_lookups = (
+                    StateLookup(quiet_fail=True),
+                    CountyLookup(quiet_fail=True),
+                    CommodityLookup(quiet_fail=True),
+                )
+    return _fallback_lookups
+
+
+def _resolve_filter_codes(
+    state: Optional[str],
+    county: Optional[str],
+    commodity: Optional[str],
+) -> Tuple[FilterCodes, bool]:
+    """
+    Returns:
+        - codes of provided state, county and commodity
+        - whether or not the name index could be used
+    """
+    try:
+        name_index = get_name_index()
+        find_state, find_county, find_commodity = (
+            name_index.find_state, name_index.find_county, name_index.find_commodity
+        )
+        index_available = True
+    except Exception:
+        logger.exception("Unable to load name index, falling back to dsmain lookups")
+        state_lookup, county_lookup, commodity_lookup = get_fallback_lookups()
+        find_state, find_county, find_commodity = (
+            state_lookup.find, county_lookup.find_by_name, commodity_lookup.find
+        )
+        index_available = False
+
+    def _find_code(field: str, find: Callable, *args: str) -> Optional[str]:
+        found = find(*args)
+        if not found:
+            lookup_misses[field] += 1
+            return None
+        return found.code
+
+    state_code, county_code, commodity_code = None, None, None
+    if state is not None:
+        state_code = _find_code("state", find_state, state)
+    if county is not None and state is not None:
+        county_code = _find_code("county", find_county, county, state)
+    if commodity is not None:
+        commodity_code = _find_code("commodity", find_commodity, commodity)
+
+    return FilterCodes(state_code, county_code, commodity_code), index_available
@@ -0,0 +1,168 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class TrigramMatcher:
+    """
+    Fuzzy string matcher based on a precomputed character trigram index.
+
+    Candidates and queries are case-folded, stripped from punctuation and crudely singularized
+    before being split into trigrams, similarity between a query and a candidate is the Dice
+    coefficient of their trigram sets. Only candidates sharing at least one trigram with the query
+    are scored.
+    """
+
+    def __init__(self, choices: Dict[str, Any], threshold: float = 0.8) -> None:
+        """
+        Args:
+            choices: candidate strings (e.g. names and aliases) mapped to the (hashable) value to
+                     return when they match, several candidates can map to the same value
+            threshold: minimum similarity (between 0 and 1) for a candidate to be considered a match
+        """
+        self.threshold = threshold
+        self._values: List[Any] = []
+        self._trigram_counts: List[int] = []
+        self._exact: Dict[str, int] = {}
+        self._index: Dict[str, List[int]] = defaultdict(list)
+        for candidate, value in choices.items():
+            normalized = self.normalize(candidate)
+            if not normalized or normalized in self._exact:
+                continue
+            candidate_id = len(self._values)
+            trigrams = self.get_trigrams(normalized)
+            self._values.append(value)
+            self._trigram_counts.append(len(trigrams))
+            self._exact[normalized] = candidate_id
+            for trigram in trigrams:
+                self._index[trigram].append(candidate_id)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Args:
+            text: text to normalize
+
+        Returns:
+            case-folded text, without punctuation or extra whitespaces, each word being singularized
+        """
+        words = re.sub(r"[^\w\s]", " ", text.casefold()).split()
+        return " ".join(_singularize(word) for word in words)
+
+    @staticmethod
+    def get_trigrams(normalized_text: str) -> Set[str]:
+        """
+        Args:
+            normalized_text: normalized text
+
+        Returns:
+            set of character trigrams of provided text, padded with a space on each side
+        """
+        padded = f" {normalized_text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def rank(self, query: str, limit: int = 5) -> List[Tuple[Any, float]]:
+        """
+        Args:
+            query: string to match
+            limit: maximum number of results
+
+        Returns:
+            best matching values along with their similarity score, sorted by decreasing score,
+            regardless of threshold
+        """
+        return self._rank_normalized(self.normalize(query), limit)
+
+    def match(self, query: str) -> Optional[Any]:
+        """
+        Args:
+            query: string to match
+
+        Returns:
+            value of best matching candidate, None if no candidate is above threshold
+        """
+        ranked = self._rank_normalized(self.normalize(query), limit=1)
+        if ranked and ranked[0][1] >= self.threshold:
+            return ranked[0][0]
+        return None
+
+    def extract(self, text: str, max_words: int = 4) -> Optional[Tuple[Any, float]]:
+        """
+        Looks for the best matching candidate within every phrase of up to max_words words of
+        provided text. When several phrases match with the same score, the longest one wins
+        (e.g. "sweet corn" over "corn").
+
+        Args:
+            text: free text, e.g. a user question
+            max_words: maximum number of words of phrases to consider
+
+        Returns:
+            value of best matching candidate along with its similarity score, None if no phrase
+            matches a candidate above threshold
+        """
+        words = self.normalize(text).split()
+        best = None
+        for i in range(len(words)):
+            for n_words in range(1, max_words + 1):
+                if i + n_words > len(words):
+                    break
+                ranked = self._rank_normalized(" ".join(words[i:i + n_words]), limit=1)
+                if not ranked or ranked[0][1] < self.threshold:
+                    continue
+                value, score = ranked[0]
+                if best is None or (score, n_words) > (best[1], best[2]):
+                    best = (value, score, n_words)
+        return (best[0], best[1]) if best is not None else None
+
+    def _rank_normalized(self, normalized_query: str, limit: int) -> List[Tuple[Any, float]]:
+        """
+        Args:
+            normalized_query: normalized string to match
+            limit: maximum number of results
+
+        Returns:
+            best matching values along with their similarity score, sorted by decreasing score
+        """
+        if not normalized_query:
+            return []
+        exact_id = self._exact.get(normalized_query)
+        if exact_id is not None and limit == 1:
+            return [(self._values[exact_id], 1.0)]
+
+        query_trigrams = self.get_trigrams(normalized_query)
+        shared_counts: Dict[int, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for candidate_id in self._index.get(trigram, ()):
+                shared_counts[candidate_id] += 1
+
+        best_scores: Dict[int, float] = {}
+        value_ids: Dict[Any, int] = {}
+        for candidate_id, shared_count in shared_counts.items():
+            score = 2 * shared_count / (len(query_trigrams) + self._trigram_counts[candidate_id])
+            # several candidates (e.g. aliases) can share the same value, only keep the best one
+            value = self._values[candidate_id]
+            value_id = value_ids.setdefault(value, candidate_id)
+            if score > best_scores.get(value_id, 0):
+                best_scores[value_id] = score
+
+        ranked = sorted(best_scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self._values[candidate_id], score) for candidate_id, score in ranked]
+
+
+def _singularize(word: str) -> str:
+    """
+    Args:
+        word: case-folded word
+
+    Returns:
+        a crude singular form of provided word, good enough to match "cherries" with "cherry"
+    """
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
@@ -3,12 +3,14 @@ import os
 import pandas as pd
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
-from croptalk.create_doc_data import query_sql_data, engine, db_url
+from croptalk.create_doc_data import CATEGORICAL_COLUMNS, concat_chunks, query_sql_data_iter, engine, db_url
 
 load_dotenv("secrets/.env.secret")
 
-SOB = query_sql_data(query="""
+# the whole table is loaded, streaming it in chunks (with categorical names and downcast integers) only
+# bounds the memory needed on top of the resulting frame
+SOB = concat_chunks(query_sql_data_iter(query="""
     SELECT * 
     FROM sob_all_years
     WHERE commodity_year >= 2010
-    """)
+    """, categorical_columns=CATEGORICAL_COLUMNS))
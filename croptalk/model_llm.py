@@ -6,18 +6,24 @@ from dotenv import load_dotenv
 from langchain.globals import set_debug
 from langchain.prompts import (ChatPromptTemplate, MessagesPlaceholder)
 from langchain.schema.messages import AIMessage, HumanMessage
-from langchain.schema.runnable import (RunnableBranch,
-                                       RunnableMap)
+from langchain.schema.runnable import RunnableMap
 
 from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import get_buffer_string
 from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import Runnable, RunnableLambda, RunnableParallel
-from pydantic.v1 import BaseModel
+from pydantic.v1 import BaseModel, validator
 
+from croptalk.commodities import find_commodity_in_text
+from croptalk.condense import (CACHED, REPHRASED, STANDALONE, condense_metrics, condensed_question_cache,
+                               get_history_hash, is_follow_up)
 from croptalk.document_retriever import DocumentRetriever
-from croptalk.prompts_llm import COMMODITY_TEMPLATE, STATE_TEMPLATE, COUNTY_TEMPLATE, DOC_CATEGORY_TEMPLATE
+from croptalk.entity_extractor import extract_entities_locally
+from croptalk.prompts_llm import ENTITIES_TEMPLATE
 from croptalk.prompts_llm import RESPONSE_TEMPLATE, REPHRASE_TEMPLATE
+from croptalk.route_classifier import ROUTE_CONFIDENCE_THRESHOLD, TOOLS_TOPIC, classify_route
+from croptalk.speculative import SpeculationMetrics, SpeculativeRouter
 from croptalk.tools import TOOLS, TOOL_PROMPT, ROUTE_TEMPLATE
 from croptalk.utils import initialize_llm
 
@@ -26,61 +32,149 @@ set_debug(True)
 load_dotenv('secrets/.env.secret')
 load_dotenv('secrets/.env.shared')
 
+# branches started along with the LLM route call: "retrieval" (default, cheap), "all" or "none"
+SPECULATIVE_ROUTING = os.getenv("SPECULATIVE_ROUTING", "retrieval")
+
+# outcomes of the branches started speculatively, and time spent on the losing ones
+speculation_metrics = SpeculationMetrics()
+
 
 def create_condense_branch(llm):
     CONDENSE_QUESTION_PROMPT = PromptTemplate.from_template(REPHRASE_TEMPLATE)
     condense_chain_hist = (CONDENSE_QUESTION_PROMPT | llm | StrOutputParser(
     )).with_config(run_name="CondenseQuestion")
-    condense_chain_no_hist = RunnableLambda(itemgetter("question")).with_config(
-        run_name="RetrievalChainWithNoHistory")
 
-    return RunnableBranch(
-        (
-            RunnableLambda(lambda x: not bool(x.get("chat_history"))).with_config(
-                run_name="HasChatHistoryCheck"),
-            condense_chain_no_hist,
-        ),
-        (condense_chain_hist),
-    ).with_config(run_name="RouteDependingOnChatHistory")
+    def condense_question(x: Dict):
+        chat_history = x.get("chat_history")
+        if not chat_history:
+            return x["question"]
+
+        # the LLM is only asked to rephrase follow-up questions, once per history and question
+        last_question = next(
+            (message.content for message in reversed(chat_history) if isinstance(message, HumanMessage)), None
+        )
+        if not is_follow_up(x["question"], last_question):
+            condense_metrics.record(STANDALONE)
+            return x["question"]
+
+        history = get_buffer_string(chat_history)
+        cache_key = (get_history_hash(history), x["question"])
+        condensed_question = condensed_question_cache.get(cache_key)
+        if condensed_question is not None:
+            condense_metrics.record(CACHED)
+            return condensed_question
+
+        condense_metrics.record(REPHRASED)
+
+        def cache_condensed_question(condensed_question: str) -> str:
+            condensed_question_cache.set(cache_key, condensed_question)
+            return condensed_question
+
+        return (
+                RunnableLambda(lambda y: dict(question=y["question"], chat_history=history))
+                | condense_chain_hist
+                | RunnableLambda(cache_condensed_question)
+        )
+
+    return RunnableLambda(condense_question).with_config(run_name="RouteDependingOnChatHistory")
+
+
+DOC_CATEGORIES = ("CIH", "BP", "CP", "SP")
+
+
+class ExtractedEntities(BaseModel):
+    """
+    Retrieval filters extracted from a question, None when the question does not mention them.
+    """
+    commodity: Optional[str] = None
+    state: Optional[str] = None
+    county: Optional[str] = None
+    doc_category: Optional[str] = None
+
+    @validator("*", pre=True)
+    def none_if_empty(cls, value):
+        if not isinstance(value, str) or value.strip().lower() in ("", "none", "null", "n/a"):
+            return None
+        return value.strip()
+
+    @validator("doc_category")
+    def known_doc_category(cls, value):
+        if value is None or value.upper() not in DOC_CATEGORIES:
+            return None
+        return value.upper()
+
+
+def create_entities_chain(llm: BaseLanguageModel) -> Runnable:
+    """
+    Args:
+        llm: LLM used to extract entities
+
+    Returns:
+        chain extracting commodity, state, county and document category from a question, with local
+        gazetteers or a single LLM call, output being a dict with those keys along with the question
+    """
+    ENTITIES_PROMPT = PromptTemplate.from_template(ENTITIES_TEMPLATE)
+
+    # a malformed answer means no filter rather than a failed request
+    entities_llm_chain = (ENTITIES_PROMPT | llm | JsonOutputParser()).with_fallbacks(
+        [RunnableLambda(lambda x: {})]
+    ).with_config(run_name="IdentifyEntities")
+
+    def validate_entities(x: Dict) -> Dict:
+        raw_entities = x["entities"] if isinstance(x["entities"], dict) else {}
+        entities = ExtractedEntities(**{key: raw_entities.get(key) for key in ExtractedEntities.__fields__})
+
+        # cheap local commodity match, more reliable than the LLM on the official commodity names
+        local_match = find_commodity_in_text(x["question"])
+        if local_match is not None:
+            entities.commodity = local_match[0]
+
+        return dict(entities.dict(), question=x["question"])
+
+    llm_chain = (
+        RunnableParallel(entities=entities_llm_chain, question=itemgetter("question"))
+        | RunnableLambda(validate_entities).with_config(run_name="ValidateEntities")
+    )
 
+    def extract_entities(x: Dict):
+        # local gazetteers first, the LLM is only called when they are not confident
+        local_entities = extract_entities_locally(x["question"])
+        if local_entities is not None and local_entities.confident:
+            return dict(commodity=local_entities.commodity,
+                        state=local_entities.state,
+                        county=local_entities.county,
+                        doc_category=local_entities.doc_category,
+                        question=x["question"])
+        return llm_chain
 
-def create_retriever_chain(llm: BaseLanguageModel, document_retriever: DocumentRetriever) -> Runnable:
-    COMMODITY_PROMPT = PromptTemplate.from_template(COMMODITY_TEMPLATE)
-    STATE_PROMPT = PromptTemplate.from_template(STATE_TEMPLATE)
-    COUNTY_PROMPT = PromptTemplate.from_template(COUNTY_TEMPLATE)
-    DOC_CATEGORY_PROMPT = PromptTemplate.from_template(DOC_CATEGORY_TEMPLATE)
+    return RunnableLambda(extract_entities).with_config(run_name="ExtractEntities")
 
+
+def create_retriever_chain(llm: BaseLanguageModel, document_retriever: DocumentRetriever) -> Runnable:
     condense_branch = create_condense_branch(llm)
-    commodity_chain = (COMMODITY_PROMPT | llm | StrOutputParser()).with_config(
-        run_name="IndentifyCommodity")
-    state_chain = (STATE_PROMPT | llm | StrOutputParser()
-                   ).with_config(run_name="IndentifyState")
-    county_chain = (COUNTY_PROMPT | llm | StrOutputParser()
-                    ).with_config(run_name="IndentifyCounty")
-    doc_category_chain = (
-            DOC_CATEGORY_PROMPT | llm | StrOutputParser()
-    ).with_config(run_name="IndentifyDocCategory")
-
-    retriever_func = RunnableLambda(lambda x: document_retriever.get_documents(query=x["question"],
-                                                                               commodity=x['commodity'],
-                                                                               state=x['state'],
-                                                                               county=x['county'],
-                                                                               doc_category=x['doc_category'],
-                                                                               include_common_docs=True)
-                                    ).with_config(run_name="RetrieverWithFilter")
+    entities_chain = create_entities_chain(llm)
+
+    def _get_retriever_kwargs(x: Dict) -> Dict:
+        return dict(query=x["question"],
+                    commodity=x["commodity"],
+                    state=x["state"],
+                    county=x["county"],
+                    doc_category=x["doc_category"],
+                    include_common_docs=True)
+
+    def get_documents(x: Dict) -> List[str]:
+        return document_retriever.get_documents(**_get_retriever_kwargs(x))
+
+    async def aget_documents(x: Dict) -> List[str]:
+        return await document_retriever.aget_documents(**_get_retriever_kwargs(x))
+
+    retriever_func = RunnableLambda(get_documents, afunc=aget_documents).with_config(run_name="RetrieverWithFilter")
 
     return (
             RunnableParallel(
                 question=condense_branch
             )
-            |
-            RunnableParallel(
-                commodity=commodity_chain,
-                state=state_chain,
-                county=county_chain,
-                doc_category=doc_category_chain,
-                question=itemgetter("question")
-            ).with_config(run_name="CommodityChain")
+            | entities_chain.with_config(run_name="CommodityChain")
             | retriever_func.with_config(run_name="FindDocs")
     )
 
@@ -146,19 +240,38 @@ def create_chain(
     augmented_retrieval_chain = create_retriever_chain(basic_llm, document_retriever)
     tool_chain = create_tool_chain(basic_llm)
 
-    chain = (
+    llm_route_chain = (
             PromptTemplate.from_template(ROUTE_TEMPLATE) | answer_llm | StrOutputParser()
-    )
+    ).with_config(run_name="ClassifyRouteWithLLM")
 
-    def route(info):
-        if "tools" in info["topic"].lower():
-            return tool_chain
-        else:
-            return augmented_retrieval_chain
+    branches = {"tools": tool_chain, "retrieval": augmented_retrieval_chain}
+
+    def select_branch(topic: str) -> str:
+        return "tools" if TOOLS_TOPIC in topic.lower() else "retrieval"
 
-    route_tool_chain = {"topic": chain, "question": lambda x: x["question"]} | RunnableLambda(
-        route
+    speculative_router = SpeculativeRouter(
+        route=llm_route_chain,
+        branches=branches,
+        select=select_branch,
+        speculative={"all": list(branches), "none": []}.get(SPECULATIVE_ROUTING, ["retrieval"]),
+        metrics=speculation_metrics,
     )
+    speculative_route_chain = RunnableLambda(
+        speculative_router.invoke, afunc=speculative_router.ainvoke
+    ).with_config(run_name="SpeculativeRoute")
+
+    def route(x: Dict):
+        # local classifier first, the LLM is only called when it is not confident, along with the
+        # speculative branches so that its latency is not added to theirs
+        decision = classify_route(x["question"])
+        if decision.confidence >= ROUTE_CONFIDENCE_THRESHOLD:
+            return branches[select_branch(decision.topic)]
+        return speculative_route_chain
+
+    route_tool_chain = {
+        "question": lambda x: x["question"],
+        "chat_history": lambda x: x["chat_history"],
+    } | RunnableLambda(route).with_config(run_name="Route")
 
     _context = RunnableMap(
         {
@@ -66,8 +66,9 @@ class OpenAIAgentModelFactory:
             - newly created OpenAI LLM chat agent using ChromaDB vectorstore
             - memory object
         """
-        # create LLM
+        # create LLM, kept to be warmed up
         llm = ChatOpenAI(model=self.llm_model_name, streaming=True, temperature=0.0)
+        self.llm = llm
         tools = self._get_tools()
         llm_with_tools = llm.bind(
             functions=[format_tool_to_openai_function(t) for t in tools]
@@ -168,6 +169,7 @@ class OpenAIAgentModelFactory:
                         "The Crop Provision include : Crop-specific coverage details, fates and deadlines, "
                         "crop-specific rules and practices, exclusions and limitations",
             func=lambda **kwargs: self.document_retriever.get_documents(**kwargs, top_k=self.top_k),
+            coroutine=lambda **kwargs: self.document_retriever.aget_documents(**kwargs, top_k=self.top_k),
             args_schema=self._RetrieverInput,
         )
         return find_docs
@@ -182,22 +184,38 @@ class OpenAIAgentModelFactory:
         doc_category: Optional[str] = Field(description="Document category. Example: SP")
 
 
-# create singleton model
-def initialize_model(convert_response_chain_to_str=True, no_memory=False):
+def create_model_factory(document_retriever: Optional[DocumentRetriever] = None) -> OpenAIAgentModelFactory:
     """
+    Args:
+        document_retriever: document retriever to use as agent's tool, created if not provided
+
     Returns:
-        - newly created OpenAI LLM chat agent using ChromaDB vectorstore
-        - memory object
+        model factory configured from environment variables
     """
-    model, memory = OpenAIAgentModelFactory(
+    if document_retriever is None:
+        document_retriever = DocumentRetriever(collection_name=os.getenv("VECTORSTORE_COLLECTION"))
+    return OpenAIAgentModelFactory(
         llm_model_name=os.getenv("MODEL_NAME"),
-        document_retriever=DocumentRetriever(collection_name=os.getenv("VECTORSTORE_COLLECTION")),
+        document_retriever=document_retriever,
         tools=TOOLS,
         top_k=int(os.getenv("VECTORSTORE_TOP_K")),
         input_key="question",
         output_key="output",
-    ).get_model(convert_response_chain_to_str=convert_response_chain_to_str, no_memory=no_memory)
-    return model, memory
+    )
+
+
+# create singleton model
+def initialize_model(convert_response_chain_to_str=True, no_memory=False, document_retriever=None):
+    """
+    Returns:
+        - newly created OpenAI LLM chat agent using ChromaDB vectorstore
+        - memory object
+    """
+    return create_model_factory(document_retriever).get_model(
+        convert_response_chain_to_str=convert_response_chain_to_str, no_memory=no_memory,
+    )
 
 
-model, memory = initialize_model()
+document_retriever = DocumentRetriever(collection_name=os.getenv("VECTORSTORE_COLLECTION"))
+model_factory = create_model_factory(document_retriever)
+model, memory = model_factory.get_model()
@@ -0,0 +1,254 @@
+import logging
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+
+from croptalk.commodities import COMMODITY_ALIASES
+from croptalk.fuzzy_matcher import TrigramMatcher
+
+logger = logging.getLogger(__name__)
+
+
+# postal abbreviations by state code, the state table only holds codes and names
+STATE_ABBREVIATIONS = {
+    "01": "AL", "02": "AK", "04": "AZ", "05": "AR", "06": "CA", "08": "CO", "09": "CT", "10": "DE",
+    "11": "DC", "12": "FL", "13": "GA", "15": "HI", "16": "ID", "17": "IL", "18": "IN", "19": "IA",
+    "20": "KS", "21": "KY", "22": "LA", "23": "ME", "24": "MD", "25": "MA", "26": "MI", "27": "MN",
+    "28": "MS", "29": "MO", "30": "MT", "31": "NE", "32": "NV", "33": "NH", "34": "NJ", "35": "NM",
+    "36": "NY", "37": "NC", "38": "ND", "39": "OH", "40": "OK", "41": "OR", "42": "PA", "44": "RI",
+    "45": "SC", "46": "SD", "47": "TN", "48": "TX", "49": "UT", "50": "VT", "51": "VA", "53": "WA",
+    "54": "WV", "55": "WI", "56": "WY", "72": "PR",
+}
+
+
+class IndexEntry(NamedTuple):
+    """
+    Lookup code (0-padded string) and official name of a state, county or commodity.
+    """
+    code: str
+    name: str
+
+
+class NameIndex:
+    """
+    In-memory index resolving state, county and commodity names to their lookup codes.
+
+    Names are case-folded, stripped from punctuation and common suffixes ("County", "State"...)
+    before being looked up, exact matches are dict lookups and fuzzy matching (trigram index) is
+    only used as a fallback.
+    """
+
+    STATE_SUFFIXES = ("state",)
+    COUNTY_SUFFIXES = ("county", "parish", "borough", "census area", "municipality")
+
+    def __init__(
+        self,
+        states: Iterable[Tuple[str, str, Optional[str]]],
+        counties: Iterable[Tuple[str, str, str]],
+        commodities: Iterable[Tuple[str, str]],
+        commodity_aliases: Optional[Dict[str, str]] = None,
+        fuzzy_cutoff: float = 0.7,
+    ) -> None:
+        """
+        Args:
+            states: (state code, state name, state abbreviation) tuples
+            counties: (state code, county code, county name) tuples
+            commodities: (commodity code, commodity name) tuples
+            commodity_aliases: alternative commodity names mapped to official commodity names
+            fuzzy_cutoff: minimum similarity (between 0 and 1) for a fuzzy match
+        """
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self._states: Dict[str, IndexEntry] = {}
+        self._states_by_code: Dict[str, IndexEntry] = {}
+        for code, name, abbreviation in states:
+            entry = IndexEntry(str(code).zfill(2), name)
+            self._states_by_code[entry.code] = entry
+            self._states[self.normalize(name, self.STATE_SUFFIXES)] = entry
+            if abbreviation:
+                self._states[self.normalize(abbreviation)] = entry
+
+        self._counties: Dict[str, Dict[str, IndexEntry]] = {}
+        self._counties_by_code: Dict[Tuple[str, str], IndexEntry] = {}
+        for state_code, code, name in counties:
+            state_code = str(state_code).zfill(2)
+            entry = IndexEntry(str(code).zfill(3), name)
+            self._counties_by_code[(state_code, entry.code)] = entry
+            self._counties.setdefault(state_code, {})[self.normalize(name, self.COUNTY_SUFFIXES)] = entry
+
+        self._commodities: Dict[str, IndexEntry] = {}
+        for code, name in commodities:
+            self._commodities[self.normalize(name)] = IndexEntry(str(code).zfill(4), name)
+        for alias, name in (commodity_aliases or {}).items():
+            entry = self._commodities.get(self.normalize(name))
+            if entry is not None:
+                self._commodities.setdefault(self.normalize(alias), entry)
+
+        self._state_matcher = TrigramMatcher(self._states, threshold=fuzzy_cutoff)
+        self._county_matchers = {
+            state_code: TrigramMatcher(state_counties, threshold=fuzzy_cutoff)
+            for state_code, state_counties in self._counties.items()
+        }
+        self._commodity_matcher = TrigramMatcher(self._commodities, threshold=fuzzy_cutoff)
+
+    @staticmethod
+    def normalize(name: str, suffixes: Tuple[str, ...] = ()) -> str:
+        """
+        Args:
+            name: name to normalize
+            suffixes: suffixes to strip from name, e.g. "county"
+
+        Returns:
+            case-folded name, without punctuation, extra whitespaces or provided suffixes
+        """
+        normalized = re.sub(r"[^\w\s]", " ", name.casefold())
+        normalized = " ".join(normalized.split())
+        for suffix in suffixes:
+            if normalized.endswith(" " + suffix):
+                normalized = normalized[:-len(suffix) - 1]
+                break
+        return normalized
+
+    def find_state(self, state: str, fuzzy: bool = True) -> Optional[IndexEntry]:
+        """
+        Args:
+            state: state name, abbreviation or code
+            fuzzy: whether (default) or not to fall back to fuzzy matching
+
+        Returns:
+            matching state entry, None if none is found
+        """
+        if state.strip().isdigit():
+            return self._states_by_code.get(state.strip().zfill(2))
+        return self._find(self._states, self._state_matcher, self.normalize(state, self.STATE_SUFFIXES), fuzzy)
+
+    def find_county(self, county: str, state: str, fuzzy: bool = True) -> Optional[IndexEntry]:
+        """
+        Args:
+            county: county name or code
+            state: state name, abbreviation or code the county belongs to
+            fuzzy: whether (default) or not to fall back to fuzzy matching
+
+        Returns:
+            matching county entry, None if none is found
+        """
+        state_entry = self.find_state(state, fuzzy)
+        if state_entry is None:
+            return None
+        if county.strip().isdigit():
+            return self._counties_by_code.get((state_entry.code, county.strip().zfill(3)))
+        if state_entry.code not in self._counties:
+            return None
+        return self._find(
+            self._counties[state_entry.code],
+            self._county_matchers[state_entry.code],
+            self.normalize(county, self.COUNTY_SUFFIXES),
+            fuzzy,
+        )
+
+    def get_counties(self, state: str) -> List[IndexEntry]:
+        """
+        Args:
+            state: state name, abbreviation or code
+
+        Returns:
+            all counties of provided state, sorted by code, empty if the state is not found
+        """
+        state_entry = self.find_state(state)
+        if state_entry is None:
+            return []
+        return sorted(
+            (entry for (state_code, _), entry in self._counties_by_code.items() if state_code == state_entry.code),
+            key=lambda entry: entry.code,
+        )
+
+    def find_commodity(self, commodity: str) -> Optional[IndexEntry]:
+        """
+        Args:
+            commodity: commodity name
+
+        Returns:
+            matching commodity entry, None if none is found
+        """
+        return self._find(self._commodities, self._commodity_matcher, self.normalize(commodity))
+
+    @staticmethod
+    def _find(
+        entries: Dict[str, IndexEntry],
+        matcher: TrigramMatcher,
+        normalized_name: str,
+        fuzzy: bool = True,
+    ) -> Optional[IndexEntry]:
+        """
+        Args:
+            entries: normalized names to entries mapping to search in
+            matcher: fuzzy matcher over the same entries
+            normalized_name: normalized name to look for
+            fuzzy: whether or not to fall back to fuzzy matching
+
+        Returns:
+            exactly matching entry if any, closest entry above fuzzy cutoff otherwise
+        """
+        if not normalized_name:
+            return None
+        entry = entries.get(normalized_name)
+        if entry is not None or not fuzzy:
+            return entry
+        return matcher.match(normalized_name)
+
+    @classmethod
+    def from_database(cls, db_url: str) -> "NameIndex":
+        """
+        Args:
+            db_url: url of the database holding state, county and commodity tables
+
+        Returns:
+            an index of all states, counties and commodities found in database
+        """
+        engine = create_engine(db_url)
+        with engine.connect() as connection:
+            states = connection.execute(text("""
+                SELECT "State Code", "State Name"
+                FROM state
+                """)).fetchall()
+            counties = connection.execute(text("""
+                SELECT "State Code", "County Code", "County Name"
+                FROM county
+                """)).fetchall()
+            commodities = connection.execute(text("""
+                SELECT "Commodity Code", "Commodity Name"
+                FROM commodity
+                """)).fetchall()
+        engine.dispose()
+
+        logger.info(f"Loaded name index: {len(states)} states, {len(counties)} counties and "
+                    f"{len(commodities)} commodities")
+        return cls(
+            states=[(code, name, STATE_ABBREVIATIONS.get(str(code).zfill(2))) for code, name in states],
+            counties=counties,
+            commodities=commodities,
+            commodity_aliases=COMMODITY_ALIASES,
+        )
+
+
+_name_index: Optional[NameIndex] = None
+_name_index_lock = threading.Lock()
+
+
+def get_name_index() -> NameIndex:
+    """
+    Requires the following environment variable to be set:
+        - POSTGRES_URI
+
+    Returns:
+        the name index singleton, loaded from database on first call
+    """
+    global _name_index
+    if _name_index is None:
+        with _name_index_lock:
+            if _name_index is None:
+                _name_index = NameIndex.from_database(os.environ["POSTGRES_URI"])
+    return _name_index
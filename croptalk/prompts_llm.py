@@ -39,47 +39,23 @@ Follow Up Input: {question}
 
 Standalone Question:"""
 
-COMMODITY_TEMPLATE = """\
-Given the following question, identify whether is it matches to any of the following commodities. 
-If it is, extract the relevant commodity and return it. If it is not, return 'None'.
+ENTITIES_TEMPLATE = """\
+Extract the following fields from the question below, and return them as a JSON object with the keys \
+"commodity", "state", "county" and "doc_category". Use null for any field the question does not mention.
 
-Commodities: \
+- commodity: the commodity the question is about, among the following commodities: \
 ['Wheat', 'Pecans', 'Cotton', 'Peaches', 'Corn', 'Peanuts', 'Whole Farm Revenue Protection', 'Soybeans', 'Pasture,Rangeland,Forage', 'Sesame', 'Controlled Environment', 'Apiculture', 'Hemp', 'Micro Farm', 'Blueberries', 'Oats', 'Fresh Market Sweet Corn', 'Grain Sorghum', 'Potatoes', 'Oysters', 'Triticale', 'Cucumbers', 'Canola', 'Popcorn', 'Fresh Market Tomatoes', 'Feeder Cattle', 'Fed Cattle', 'Cattle', 'Weaned Calves', 'Swine', 'Milk', 'Dairy Cattle', 'Forage Production', 'Dry Peas', 'Barley', 'Cabbage', 'Onions', 'Cotton Ex Long Staple', 'Chile Peppers', 'Dry Beans', 'Apples', 'Pistachios', 'Grapefruit', 'Lemons', 'Tangelos', 'Oranges', 'Mandarins/Tangerines', 'Rice', 'Hybrid Seed Rice', 'Grapes', 'Forage Seeding', 'Walnuts', 'Almonds', 'Prunes', 'Safflower', 'Cherries', 'Processing Cling Peaches', 'Kiwifruit', 'Olives', 'Tomatoes', 'Fresh Apricots', 'Processing Apricots', 'Pears', 'Raisins', 'Table Grapes', 'Figs', 'Plums', 'Alfalfa Seed', 'Strawberries', 'Tangelo Trees', 'Orange Trees', 'Grapefruit Trees', 'Lemon Trees', 'Fresh Nectarines', 'Processing Freestone', 'Fresh Freestone Peaches', 'Mandarin/Tangerine Trees', 'Pomegranates', 'Sugar Beets', 'Grapevine', 'Cultivated Wild Rice', 'Mint', 'Avocados', 'Caneberries', 'Millet', 'Sunflowers', 'Annual Forage', 'Nursery (NVS)', 'Silage Sorghum', 'Hybrid Sweet Corn Seed', 'Cigar Binder Tobacco', 'Cigar Wrapper Tobacco', 'Sweet Corn', 'Processing Beans', 'Green Peas', 'Flue Cured Tobacco', 'Tangors', 'Peppers', 'Sugarcane', 'Macadamia Nuts', 'Macadamia Trees', 'Banana', 'Coffee', 'Papaya', 'Banana Tree', 'Coffee Tree', 'Papaya Tree', 'Hybrid Popcorn Seed', 'Mustard', 'Grass Seed', 'Flax', 'Hybrid Corn Seed', 'Pumpkins', 'Burley Tobacco', 'Hybrid Sorghum Seed', 'Camelina', 'Dark Air Tobacco', 'Fire Cured Tobacco', 'Sweet Potatoes', 'Maryland Tobacco', 'Cranberries', 'Clams', 'Buckwheat', 'Rye', 'Fresh Market Beans', 'Clary Sage', 'Hybrid Vegetable Seed', 'Cigar Filler Tobacco', 'Tangerine Trees', 'Lime Trees']
-Question: {question}
-commodity: """
+- state: the name of the US state the question mentions, ex : "New York" for "I live in New York (NY), Niagara"
+- county: the name of the county the question mentions, without "County", ex : "Ventura" for "I live in California, \
+Ventura County"
+- doc_category: the abbreviation of the document category the question mentions, among: CIH (Crop Insurance \
+Handbook), BP (Basic Provisions), CP (Crop Provisions) and SP (Special Provisions)
 
-STATE_TEMPLATE = """\
-Identify whether the following text mentions a state of the US.
-If it does, return the state name. Otherwise, return None.
-Only return the name of the state, nothing else.
-Example : "I live in New York (NY), Niagara" -> "New York"
-Example: "I live in California, Ventura County" -> "California"
-Text: {question}
-State: """
-
-COUNTY_TEMPLATE = """\
-Identify whether the following text mentions a county of the US state.
-If it does, return the county name. Otherwise, return None.
-Example: "I live in California, Ventura County" -> "Ventura"
-Text: {question}
-County: """
-
-DOC_CATEGORY_TEMPLATE = """\
-Given the following question, identify whether it mentions any of the following document categories.
-If it does, return the document category abbreviation. Otherwise, return None.
-
-Example: "Is there a special provisions document for apples in Yakima county Washington for APH insurance plan?" -> "SP"
-Example: "Show me sections of CIH related to apples" -> "CIH"
-Document categories table: \
-Abbreviation,Full Name
-CIH,Crop Insurance Handbook
-BP,Basic Provisions
-CP,Crop Provisions
-SP,Special Provisions
+Example: "Is there a special provisions document for apples in Yakima county Washington?" -> \
+{{"commodity": "Apples", "state": "Washington", "county": "Yakima", "doc_category": "SP"}}
 
 Question: {question}
-Document category:
-"""
+JSON: """
 
 COMMODITY_TEMPLATE_TOOL = """\
 Given the following words identify whether is it matches to any of the following commodities. 
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+import joblib
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline, make_pipeline
+
+logger = logging.getLogger(__name__)
+
+TOOLS_TOPIC = "tools"
+OTHER_TOPIC = "other"
+
+# below this probability, the route is left to the LLM
+ROUTE_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTE_CONFIDENCE_THRESHOLD", 0.75))
+
+# unambiguous wordings, checked before the model
+TOOLS_PATTERNS = [
+    # SP documents
+    re.compile(r"\bSP doc(ument)?s?\b|special provisions? (of insurance )?doc(ument)?s?\b", re.IGNORECASE),
+    # WFRP commodities
+    re.compile(r"\b(WFRP|whole farm)\b.*\bcommodit(y|ies)\b|\bcommodit(y|ies)\b.*\b(WFRP|whole farm)\b",
+               re.IGNORECASE),
+    re.compile(r"\bsummary of business\b|\bSOB\b", re.IGNORECASE),
+]
+OTHER_PATTERNS = [
+    re.compile(r"\bCIH\b|crop insurance handbook|\bbasic provisions?\b|\bcrop provisions?\b|\bdefinitions? of\b",
+               re.IGNORECASE),
+]
+# SOB metrics are also policy terms ("liability under the basic provisions"), they only decide the route
+# along with a market data cue, i.e. an aggregation, a year or a county
+SOB_METRIC_PATTERN = re.compile(
+    r"\bpolic(y|ies) (sold|indemnified|earning premium)\b|\bloss ratios?\b|\bliabilit(y|ies)\b|"
+    r"\bcost to (the )?growers?\b|\bexpected payouts?\b|\bclaim probability\b",
+    re.IGNORECASE,
+)
+SOB_CUE_PATTERN = re.compile(
+    r"\b(total|average|avg|sum|highest|lowest|top|most|least|number of|how many|percentage|trend|compare|"
+    r"county|counties|nationwide|(19|20)\d{2}|by (year|state|county|coverage level|plan|commodity|crop))\b",
+    re.IGNORECASE,
+)
+
+# seed questions the model is trained on, evaluation files are left out so that they measure generalization
+TOOLS_EXAMPLES = [
+    "what are the available commodities for WFRP for Butte county in California",
+    "which commodities can be insured under whole farm revenue protection in Fresno county for 2024",
+    "list the WFRP commodities for state code 06 and county code 019",
+    "find me the special provision document related to Oranges in Yakima, Washington for the year 2024",
+    "SP document for corn in Butte, California, 2022",
+    "get me the SP document for corn in Iowa for Pottawattamie county",
+    "special provisions for wheat, Whitman, Washington, 2023",
+    "link to the special provisions of cherries in Grant county Washington",
+    "What is the total of policies sold in the state of New York for the WFRP policy in year 2023",
+    "What is the total number of policies sold for Bee county in Texas, for corn, for the RP program",
+    "What is the average cost to grower under the APH policy for walnuts in Fresno county in California",
+    "What is the average loss ratio by insurance plan name and year",
+    "Which insurance plan has the highest average expected payout in 2023",
+    "What is the percentage of policies indemnified for Washakie county in Wyoming",
+    "What are the total premiums and liabilities for soybeans in 2023",
+    "how many policies were sold for almonds in California last year",
+    "which county has the highest total premium for apples",
+    "what is the most popular coverage level for corn in Iowa",
+    "how has the average coverage level for wheat changed over the last 5 years",
+    "which state insures the most acres of cotton",
+    "how many units were indemnified for pears in Oregon in 2021",
+    "what is the total insured acreage of blueberries by year",
+    "compare the premium per acre of cherries between Washington and Oregon",
+    "which crops have the most policies in Texas",
+    "trend of premiums for peanuts in Georgia over the last decade",
+    "what share of growers buy the 85% coverage level for soybeans",
+    "how many growers received an indemnity for grapes in 2022",
+    "top 5 commodities by total premium in Kansas",
+]
+OTHER_EXAMPLES = [
+    "What is the definition of a unit?",
+    "What causes of loss are insured for cherries?",
+    "When is the final planting date for soybeans in Ohio?",
+    "What does the Basic Provisions say about late planting?",
+    "Explain prevented planting coverage",
+    "What is the difference between revenue protection and yield protection?",
+    "What are the acreage reporting requirements?",
+    "How is the production guarantee calculated for peaches?",
+    "Is a replant payment available for cotton?",
+    "Show me the sections of the Crop Insurance Handbook about written agreements",
+    "What are the quality adjustment rules for wheat?",
+    "How are organic practices insured?",
+    "How is an indemnity calculated for grapes?",
+    "What is the insurance period for citrus?",
+    "What is the end of insurance period for pears in Oregon?",
+    "Which varieties of pecans are insurable in Georgia?",
+    "What is the earliest planting date for rice in Arkansas?",
+    "What is the price election for walnuts?",
+    "What is the premium rate for apples?",
+    "How do I report damage to my blueberries?",
+    "What is APH and how is it calculated?",
+    "What are the notice of loss requirements?",
+    "Are hail losses covered under the crop provisions for tomatoes?",
+    "What is the sales closing date for barley in Montana?",
+    "What does the coverage level mean for the minimum payment?",
+    "what is the whole farm revenue protection program?",
+    "What records must be kept for WFRP?",
+    "oranges?",
+    "are grapes grown in Napa county California?",
+    "What is an enterprise unit?",
+]
+
+
+class RouteDecision(NamedTuple):
+    """
+    Route of a question, as decided locally.
+    """
+    topic: str
+    confidence: float
+    # "rules" or "model"
+    source: str
+
+
+class RouteClassifier:
+    """
+    Classifies a question between the `tools` and `other` topics of ROUTE_TEMPLATE, with keyword rules
+    first (tools wordings, then policy document wordings, then SOB metrics along with a market data cue)
+    and a TF-IDF + logistic regression model otherwise.
+    """
+
+    def __init__(self, pipeline: Pipeline) -> None:
+        """
+        Args:
+            pipeline: trained text classification pipeline, with predict_proba
+        """
+        self.pipeline = pipeline
+
+    @classmethod
+    def train(cls, examples: List[Tuple[str, str]]) -> "RouteClassifier":
+        """
+        Args:
+            examples: (question, topic) pairs
+
+        Returns:
+            classifier trained on provided examples
+        """
+        pipeline = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, lowercase=True),
+            LogisticRegression(C=10, class_weight="balanced"),
+        )
+        questions, topics = zip(*examples)
+        pipeline.fit(list(questions), list(topics))
+        return cls(pipeline)
+
+    def classify(self, question: str) -> RouteDecision:
+        """
+        Args:
+            question: user question
+
+        Returns:
+            topic of the question, along with the confidence of the decision
+        """
+        if any(pattern.search(question) for pattern in TOOLS_PATTERNS):
+            return RouteDecision(TOOLS_TOPIC, 1.0, "rules")
+        if any(pattern.search(question) for pattern in OTHER_PATTERNS):
+            return RouteDecision(OTHER_TOPIC, 1.0, "rules")
+        if SOB_METRIC_PATTERN.search(question) and SOB_CUE_PATTERN.search(question):
+            return RouteDecision(TOOLS_TOPIC, 1.0, "rules")
+
+        probabilities = self.pipeline.predict_proba([question])[0]
+        best = probabilities.argmax()
+        return RouteDecision(str(self.pipeline.classes_[best]), float(probabilities[best]), "model")
+
+
+def get_training_examples() -> List[Tuple[str, str]]:
+    """
+    Returns:
+        (question, topic) pairs the route model is trained on
+    """
+    return ([(question, TOOLS_TOPIC) for question in TOOLS_EXAMPLES]
+            + [(question, OTHER_TOPIC) for question in OTHER_EXAMPLES])
+
+
+def get_training_hash(examples: List[Tuple[str, str]]) -> str:
+    """
+    Args:
+        examples: (question, topic) pairs
+
+    Returns:
+        hash of the examples and of the scikit-learn version, any change requires the model to be trained again
+    """
+    content = json.dumps({"examples": examples, "sklearn": sklearn.__version__}, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def load_route_classifier(model_dir: str) -> RouteClassifier:
+    """
+    Loads the route model from a file named after the hash of the training examples, it is trained
+    (in milliseconds) and saved there first when the examples changed.
+
+    Args:
+        model_dir: directory route models are persisted to
+
+    Returns:
+        route classifier
+    """
+    examples = get_training_examples()
+    model_path = os.path.join(model_dir, f"{get_training_hash(examples)}.joblib")
+
+    if os.path.exists(model_path):
+        # model was written by this function, it can be unpickled safely
+        route_classifier = RouteClassifier(joblib.load(model_path))
+        logger.info(f"Loaded route model from {model_path}")
+        return route_classifier
+
+    route_classifier = RouteClassifier.train(examples)
+    try:
+        os.makedirs(model_dir, exist_ok=True)
+        # write to a temporary file first so that concurrent processes never load a partial model
+        tmp_path = f"{model_path}.{os.getpid()}.tmp"
+        joblib.dump(route_classifier.pipeline, tmp_path)
+        os.replace(tmp_path, model_path)
+        logger.info(f"Saved route model to {model_path}")
+    except OSError as e:
+        logger.warning(f"Unable to save route model to {model_path} : {e}")
+    return route_classifier
+
+
+_route_classifier: Optional[RouteClassifier] = None
+_route_classifier_lock = threading.Lock()
+
+
+def get_route_classifier() -> RouteClassifier:
+    """
+    Returns:
+        route classifier, loaded on first use and shared across requests
+    """
+    global _route_classifier
+    if _route_classifier is None:
+        with _route_classifier_lock:
+            if _route_classifier is None:
+                _route_classifier = load_route_classifier(os.getenv("ROUTE_MODEL_DIR", "data/route_model"))
+    return _route_classifier
+
+
+def classify_route(question: str) -> RouteDecision:
+    """
+    Args:
+        question: user question
+
+    Returns:
+        topic of the question, along with the confidence of the decision
+    """
+    return get_route_classifier().classify(question)
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+from croptalk.utils import extract_pdf_pages, get_s3_client, remove_long_words
+
+logger = logging.getLogger(__name__)
+
+
+class S3PDFCache:
+    """
+    Local on-disk cache of the extracted and cleaned text of PDF documents stored in S3.
+
+    Cached files are content-addressed by S3 key and ETag, so a document updated in S3 gets a new
+    cache entry. The ETag of a key is only checked against S3 once every revalidate_after seconds,
+    in between, cached documents are served from disk without any S3 call. Least recently used
+    documents are evicted once the cache grows beyond max_bytes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        revalidate_after: float = 24 * 3600,
+    ) -> None:
+        """
+        Args:
+            cache_dir: directory cached files are written to, created if needed
+            max_bytes: maximum total size of cached files
+            revalidate_after: number of seconds after which the ETag of a cached key is checked
+                              against S3
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_pages(self, bucket_name: str, file_key: str) -> List[str]:
+        """
+        Args:
+            bucket_name: S3 bucket of the PDF document
+            file_key: S3 key of the PDF document
+
+        Returns:
+            cleaned text (see remove_long_words) of each page of the PDF document
+        """
+        etag = self._get_etag(bucket_name, file_key)
+        if etag is not None:
+            pages = self._read_json(self._get_path(bucket_name, file_key, etag, ".json"))
+            if pages is not None:
+                with self._lock:
+                    self.hits += 1
+                return pages
+
+        with self._lock:
+            self.misses += 1
+        response = get_s3_client().get_object(Bucket=bucket_name, Key=file_key)
+        etag = response["ETag"].strip('"')
+        # only the extracted text is cached, the PDF itself is never read again
+        pages = [remove_long_words(page) for page in extract_pdf_pages(response["Body"].read())]
+
+        self._write(self._get_path(bucket_name, file_key, etag, ".json"), json.dumps(pages).encode())
+        self._write(
+            self._get_meta_path(bucket_name, file_key),
+            json.dumps({"etag": etag, "validated_at": time.time()}).encode(),
+        )
+        self._evict()
+        return pages
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            cache counters, useful for logging and monitoring
+        """
+        size_bytes = sum(entry.stat().st_size for entry in self._list_files())
+        with self._lock:
+            return {"size_bytes": size_bytes, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+    def _get_etag(self, bucket_name: str, file_key: str) -> Optional[str]:
+        """
+        Returns:
+            ETag of the cached version of provided key, None if the key is not cached or its cached
+            version is outdated
+        """
+        meta_path = self._get_meta_path(bucket_name, file_key)
+        meta = self._read_json(meta_path)
+        if meta is None:
+            return None
+        if time.time() - meta["validated_at"] < self.revalidate_after:
+            return meta["etag"]
+
+        # revalidate cached version against S3, without downloading the document
+        try:
+            etag = get_s3_client().head_object(Bucket=bucket_name, Key=file_key)["ETag"].strip('"')
+        except Exception:
+            logger.exception(f"Unable to revalidate {file_key}, serving cached version")
+            return meta["etag"]
+        if etag != meta["etag"]:
+            return None
+        self._write(meta_path, json.dumps({"etag": etag, "validated_at": time.time()}).encode())
+        return etag
+
+    def _get_path(self, bucket_name: str, file_key: str, etag: str, extension: str) -> str:
+        digest = hashlib.sha256(f"{bucket_name}/{file_key}/{etag}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest + extension)
+
+    def _get_meta_path(self, bucket_name: str, file_key: str) -> str:
+        digest = hashlib.sha256(f"{bucket_name}/{file_key}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".meta")
+
+    def _read_json(self, path: str) -> Optional[object]:
+        try:
+            with open(path, "rb") as f:
+                content = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        # touch file, modification time is used for LRU eviction
+        os.utime(path)
+        return content
+
+    def _write(self, path: str, content: bytes) -> None:
+        # write to a temporary file first so that readers never see a partially written file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _list_files(self) -> List[os.DirEntry]:
+        return [
+            entry for entry in os.scandir(self.cache_dir)
+            if entry.is_file() and not entry.name.endswith(".tmp")
+        ]
+
+    def _evict(self) -> None:
+        with self._lock:
+            files = []
+            for entry in self._list_files():
+                try:
+                    files.append((entry.stat(), entry.path))
+                except FileNotFoundError:
+                    continue
+            total_bytes = sum(stat.st_size for stat, _ in files)
+            for stat, path in sorted(files, key=lambda item: item[0].st_mtime):
+                if total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                total_bytes -= stat.st_size
+                logger.info(f"Evicted {path} from S3 PDF cache")
+
+
+sp_document_cache = S3PDFCache(
+    cache_dir=os.getenv("SP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "croptalk", "sp_cache")),
+    max_bytes=int(os.getenv("SP_CACHE_MAX_MB", 512)) * 1024 * 1024,
+)
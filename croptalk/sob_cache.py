@@ -0,0 +1,64 @@
+import os
+import re
+
+from langchain_community.utilities import SQLDatabase
+
+from croptalk.cache import TTLCache
+
+# SOB data is refreshed daily, cached results should not outlive a refresh
+SOB_CACHE_TTL = float(os.getenv("SOB_CACHE_TTL", 24 * 3600))
+
+# normalized SQL query -> query result
+sql_result_cache = TTLCache(max_size=1024, ttl=SOB_CACHE_TTL)
+
+# normalized user question -> SOB SQL agent answer, backed by a successful query
+sob_question_cache = TTLCache(max_size=1024, ttl=SOB_CACHE_TTL)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Args:
+        sql: SQL query
+
+    Returns:
+        provided query without extra whitespaces or trailing semicolon, string literals are left
+        untouched
+    """
+    return " ".join(sql.split()).rstrip(";").strip()
+
+
+def normalize_question(question: str) -> str:
+    """
+    Args:
+        question: user question
+
+    Returns:
+        lower-cased question, without punctuation or extra whitespaces
+    """
+    return " ".join(re.sub(r"[^\w\s.]", " ", question.lower()).split()).rstrip(".")
+
+
+def invalidate_sob_caches() -> None:
+    """
+    Drops cached SQL results and questions, should be called once SOB data has been refreshed.
+    """
+    sql_result_cache.invalidate()
+    sob_question_cache.invalidate()
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    SQLDatabase whose query results are cached, keyed on normalized SQL text.
+    """
+
+    def run(self, command, fetch="all", include_columns=False, **kwargs):
+        # only plain text queries, without bound parameters, are cached
+        if not isinstance(command, str) or fetch == "cursor" or kwargs.get("parameters"):
+            return super().run(command, fetch, include_columns, **kwargs)
+
+        cache_key = (normalize_sql(command), fetch, include_columns)
+        result = sql_result_cache.get(cache_key)
+        if result is None:
+            result = super().run(command, fetch, include_columns, **kwargs)
+            sql_result_cache.set(cache_key, result)
+        return result
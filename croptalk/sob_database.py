@@ -0,0 +1,73 @@
+import logging
+import os
+
+from croptalk.sob_cache import CachedSQLDatabase
+from croptalk.sob_rollups import SOB_ROLLUPS, SOB_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Parquet snapshot layout, see croptalk/create_sob_parquet.py
+SOB_PARTITION_COLUMNS = ["commodity_year", "state_abbreviation"]
+
+
+def register_sob_parquet(duckdb_path: str, parquet_dir: str) -> None:
+    """
+    Creates (or replaces) a sob_all_years view over the Parquet snapshot in a DuckDB database
+    file, data is read from the Parquet files at query time and pruned on partition columns.
+    Requires duckdb.
+
+    Args:
+        duckdb_path: DuckDB database file, created if needed
+        parquet_dir: directory of the partitioned Parquet dataset
+    """
+    import duckdb
+
+    parquet_glob = os.path.join(os.path.abspath(parquet_dir), "**", "*.parquet")
+    with duckdb.connect(duckdb_path) as connection:
+        connection.execute(
+            f"CREATE OR REPLACE VIEW {SOB_TABLE} AS "
+            f"SELECT * FROM read_parquet('{parquet_glob}', hive_partitioning = true)"
+        )
+
+
+def get_sob_database() -> CachedSQLDatabase:
+    """
+    SOB data is queried from Postgres by default. Setting SOB_BACKEND environment variable to
+    "duckdb" queries the local Parquet snapshot instead, through the DuckDB database file set in
+    SOB_DUCKDB_PATH (requires duckdb and duckdb-engine).
+
+    Requires the following environment variable to be set for Postgres backend:
+        - POSTGRES_URI_READ_ONLY
+
+    Returns:
+        database the SOB SQL agent is allowed to query, only exposing sob_all_years table and its
+        rollup tables, if they have been created (see croptalk/create_sob_rollups.py)
+    """
+    backend = os.getenv("SOB_BACKEND", "postgres").lower()
+
+    if backend == "duckdb":
+        duckdb_path = os.environ["SOB_DUCKDB_PATH"]
+        logger.info(f"Querying SOB data from DuckDB snapshot {duckdb_path}")
+        return _from_uri(
+            f"duckdb:///{duckdb_path}",
+            engine_args={"connect_args": {"read_only": True}},
+            view_support=True,
+        )
+
+    if backend != "postgres":
+        raise ValueError(f"Unsupported SOB backend : {backend}")
+
+    return _from_uri(os.environ["POSTGRES_URI_READ_ONLY"])
+
+
+def _from_uri(database_uri: str, **kwargs) -> CachedSQLDatabase:
+    try:
+        return CachedSQLDatabase.from_uri(
+            database_uri,
+            include_tables=[SOB_TABLE] + [rollup.table for rollup in SOB_ROLLUPS],
+            **kwargs,
+        )
+    except ValueError:
+        # include_tables are checked against the database
+        logger.warning("SOB rollup tables not found, querying sob_all_years only")
+        return CachedSQLDatabase.from_uri(database_uri, include_tables=[SOB_TABLE], **kwargs)
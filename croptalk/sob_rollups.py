@@ -0,0 +1,158 @@
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+SOB_TABLE = "sob_all_years"
+
+# summed as is
+SOB_ROLLUP_SUMS = [
+    "policies_sold_count",
+    "policies_indemnified_count",
+    "total_premium_amount",
+    "liability_amount",
+]
+
+# summed weighted by policies_sold_count, as <column>_weighted_sum, so that averages weighted by
+# policies_sold_count can be computed from any rollup
+SOB_ROLLUP_WEIGHTED_SUMS = [
+    "loss_ratio",
+    "cost_to_grower",
+    "expected_payout",
+]
+
+SQL_KEYWORDS = frozenset([
+    "select", "from", "where", "and", "or", "not", "in", "is", "null", "group", "by", "order", "having",
+    "limit", "as", "desc", "asc", "distinct", "between", "like", "ilike", "case", "when", "then", "else",
+    "end", "sum", "avg", "count", "min", "max", "round", "cast", "nullif", "coalesce", "float", "numeric",
+    "integer", "decimal", "true", "false",
+])
+
+
+class SOBRollup(NamedTuple):
+    """
+    Summary table of sob_all_years, aggregated on dimensions.
+    """
+    table: str
+    dimensions: List[str]
+    indexes: List[Tuple[str, ...]]
+
+    @property
+    def columns(self) -> List[str]:
+        return self.dimensions + SOB_ROLLUP_SUMS + [f"{column}_weighted_sum" for column in SOB_ROLLUP_WEIGHTED_SUMS]
+
+
+# smallest rollups first
+SOB_ROLLUPS = [
+    SOBRollup(
+        "sob_rollup_plan",
+        ["commodity_year", "insurance_plan_name_abbreviation", "commodity_name"],
+        [("commodity_year", "insurance_plan_name_abbreviation"), ("commodity_name", "commodity_year")],
+    ),
+    SOBRollup(
+        "sob_rollup_state",
+        ["commodity_year", "state_abbreviation", "insurance_plan_name_abbreviation", "commodity_name"],
+        [("state_abbreviation", "commodity_name", "commodity_year"), ("commodity_year", "insurance_plan_name_abbreviation")],
+    ),
+    SOBRollup(
+        "sob_rollup_county",
+        ["commodity_year", "state_abbreviation", "county_name", "insurance_plan_name_abbreviation", "commodity_name"],
+        [("state_abbreviation", "county_name", "commodity_name", "commodity_year")],
+    ),
+]
+
+
+def get_rollup_query(rollup: SOBRollup, table: Optional[str] = None) -> str:
+    """
+    Args:
+        rollup: rollup to compute
+        table: name of the created table, defaults to rollup table
+
+    Returns:
+        SQL statement creating rollup table from sob_all_years table
+    """
+    dimensions = ", ".join(rollup.dimensions)
+    measures = [f"SUM({column}) AS {column}" for column in SOB_ROLLUP_SUMS]
+    measures += [f"SUM({column} * policies_sold_count) AS {column}_weighted_sum" for column in SOB_ROLLUP_WEIGHTED_SUMS]
+    return f"CREATE TABLE {table or rollup.table} AS " \
+           f"SELECT {dimensions}, {', '.join(measures)} " \
+           f"FROM {SOB_TABLE} GROUP BY {dimensions}"
+
+
+def describe_rollups(available_tables: Iterable[str]) -> str:
+    """
+    Args:
+        available_tables: tables available to the SOB SQL agent
+
+    Returns:
+        description of the available rollup tables, to be included in the SOB SQL agent prompt, empty
+        if none is available
+    """
+    available_tables = set(available_tables)
+    rollups = [rollup for rollup in SOB_ROLLUPS if rollup.table in available_tables]
+    if not rollups:
+        return ""
+
+    description = "The following summary tables hold pre-aggregated sob_all_years data, always prefer the " \
+                  "smallest one that has every column the question needs over sob_all_years:\n"
+    for rollup in rollups:
+        description += f"- {rollup.table}, one row per {', '.join(rollup.dimensions)}\n"
+    description += f"Summary tables hold the sums of {', '.join(SOB_ROLLUP_SUMS)}, and the sums of " + \
+                   ", ".join(f"{column} * policies_sold_count as {column}_weighted_sum"
+                             for column in SOB_ROLLUP_WEIGHTED_SUMS) + \
+                   ". For instance, the average loss ratio is SUM(loss_ratio_weighted_sum) / SUM(policies_sold_count)."
+    return description
+
+
+# only sums add up across rollup rows, any other aggregate (or a nested expression) has to read sob_all_years
+AGGREGATE_PATTERN = re.compile(r"\b(sum|avg|count|min|max)\s*\(")
+SUM_PATTERN = re.compile(r"\bsum\s*\(([^()]*)\)")
+
+
+def _is_rollup_sum(argument: str) -> bool:
+    """
+    Returns:
+        whether SUM(argument) can be computed from a rollup, i.e. argument is a summed column, or a
+        weighted column multiplied by policies_sold_count
+    """
+    terms = sorted(term.strip() for term in argument.split("*"))
+    if len(terms) == 1:
+        return terms[0] in SOB_ROLLUP_SUMS
+    if len(terms) == 2 and "policies_sold_count" in terms:
+        terms.remove("policies_sold_count")
+        return terms[0] in SOB_ROLLUP_WEIGHTED_SUMS
+    return False
+
+
+def find_rollup(query: str, available_tables: Iterable[str]) -> Optional[SOBRollup]:
+    """
+    Args:
+        query: SQL query run against sob_all_years table
+        available_tables: tables available to the SOB SQL agent
+
+    Returns:
+        smallest available rollup that gives the same answer to provided query, None if the query does
+        not read sob_all_years, uses an aggregate other than SUM of a summed column (or of a weighted
+        column times policies_sold_count), or uses a non-aggregated column that is not a rollup dimension
+    """
+    # string literals (e.g. county names) are not columns
+    query = re.sub(r"'[^']*'", "''", query.lower())
+    if SOB_TABLE not in re.findall(r"\b[a-z_][a-z0-9_]*\b", query):
+        return None
+
+    if not all(_is_rollup_sum(argument) for argument in SUM_PATTERN.findall(query)):
+        return None
+    query = SUM_PATTERN.sub(" ", query)
+    if AGGREGATE_PATTERN.search(query):
+        return None
+
+    # every column left (selected, filtered, grouped...) is read row by row
+    identifiers = set(re.findall(r"\b[a-z_][a-z0-9_]*\b", query))
+    aliases = set(re.findall(r"\bas\s+([a-z_][a-z0-9_]*)", query))
+    columns = identifiers - aliases - SQL_KEYWORDS - {SOB_TABLE}
+
+    available_tables = set(available_tables)
+    for rollup in SOB_ROLLUPS:
+        if rollup.table not in available_tables:
+            continue
+        if columns <= set(rollup.dimensions):
+            return rollup
+    return None
@@ -0,0 +1,253 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from croptalk.bm25 import BM25
+from croptalk.cache import TTLCache
+from croptalk.s3_cache import sp_document_cache
+
+logger = logging.getLogger(__name__)
+
+SP_BUCKET = "croptalk-spoi"
+
+# table filled offline by croptalk/create_sp_text_data.py
+SP_PAGES_TABLE = "sp_pages"
+
+SP_FILES_QUERY = text("""
+    SELECT year, s3_key
+    FROM sp_files
+    WHERE commodity_name = :commodity_name AND state_name = :state_name AND county_name = :county_name
+    """)
+
+# passages and BM25 index of recently requested SP documents
+_passages_cache = TTLCache(max_size=64, ttl=3600)
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+class Passage(NamedTuple):
+    """
+    Consecutive words of a SP document page.
+    """
+    page_number: int
+    content: str
+
+
+def get_engine() -> Engine:
+    """
+    Requires the following environment variable to be set:
+        - POSTGRES_URI
+
+    Connection pool can be configured through SQL_POOL_SIZE, SQL_MAX_OVERFLOW and SQL_POOL_RECYCLE
+    (seconds) environment variables.
+
+    Returns:
+        the pooled SQLAlchemy engine used to read SP data, created on first call
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(
+                    os.environ["POSTGRES_URI"],
+                    pool_size=int(os.getenv("SQL_POOL_SIZE", 5)),
+                    max_overflow=int(os.getenv("SQL_MAX_OVERFLOW", 10)),
+                    pool_recycle=int(os.getenv("SQL_POOL_RECYCLE", 1800)),
+                    # connections dropped by the server (e.g. idle timeout) are replaced transparently
+                    pool_pre_ping=True,
+                )
+    return _engine
+
+
+def warm_up_engine(nb_connections: Optional[int] = None) -> None:
+    """
+    Opens pool connections ahead of the first requests, they are kept open by the pool once released.
+
+    Args:
+        nb_connections: number of connections to open, defaults to the pool size
+    """
+    engine = get_engine()
+    connections = [engine.connect() for _ in range(nb_connections or engine.pool.size())]
+    for connection in connections:
+        connection.execute(text("SELECT 1"))
+        connection.close()
+
+
+class SPFileIndex:
+    """
+    In-memory index of sp_files table: (commodity, state, county) names to available (year, s3_key).
+
+    The index is loaded on first use and reloaded in the background once it is older than
+    refresh_after seconds, stale data being served in the meantime.
+    """
+
+    def __init__(self, refresh_after: float = 3600, retry_after: float = 60) -> None:
+        """
+        Args:
+            refresh_after: number of seconds after which the index is reloaded from database
+            retry_after: number of seconds to wait before loading the index again after a failure,
+                         callers fall back to querying the database meanwhile
+        """
+        self.refresh_after = refresh_after
+        self.retry_after = retry_after
+        self._index: Optional[Dict[Tuple[str, str, str], List[Tuple[int, str]]]] = None
+        self._loaded_at = 0.0
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def load(self) -> None:
+        """
+        Loads the whole sp_files table in memory.
+        """
+        with get_engine().connect() as connection:
+            rows = connection.execute(text("""
+                SELECT commodity_name, state_name, county_name, year, s3_key
+                FROM sp_files
+                """)).fetchall()
+
+        index = defaultdict(list)
+        for commodity_name, state_name, county_name, year, s3_key in rows:
+            index[(commodity_name, state_name, county_name)].append((int(year), s3_key))
+        self._index = dict(index)
+        self._loaded_at = time.monotonic()
+        logger.info(f"Loaded SP file index: {len(rows)} SP files")
+
+    def get(self, commodity_name: str, state_name: str, county_name: str) -> Optional[List[Tuple[int, str]]]:
+        """
+        Args:
+            commodity_name: lower-cased commodity name
+            state_name: lower-cased state name
+            county_name: lower-cased county name
+
+        Returns:
+            available (year, s3_key) for provided commodity, state and county, None if the index
+            could not be loaded (loading is only retried retry_after seconds after a failure)
+        """
+        if self._index is None:
+            # requests should not queue behind the lock for a database that just failed
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_after:
+                return None
+            with self._lock:
+                if self._index is None:
+                    try:
+                        self.load()
+                        self._failed_at = None
+                    except SQLAlchemyError as e:
+                        logger.warning(f"Unable to load SP file index, retrying in {self.retry_after}s : {e}")
+                        self._failed_at = time.monotonic()
+                        return None
+        elif time.monotonic() - self._loaded_at > self.refresh_after:
+            self._refresh_in_background()
+        return self._index.get((commodity_name, state_name, county_name), [])
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _refresh():
+            try:
+                self.load()
+            except SQLAlchemyError as e:
+                logger.warning(f"Unable to refresh SP file index, keeping stale one : {e}")
+                # retry later rather than on every call
+                self._loaded_at = time.monotonic()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=_refresh, name="sp-file-index-refresh", daemon=True).start()
+
+
+sp_file_index = SPFileIndex(refresh_after=float(os.getenv("SP_INDEX_REFRESH_SECONDS", 3600)))
+
+
+def get_sp_files(commodity_name: str, state_name: str, county_name: str) -> List[Tuple[int, str]]:
+    """
+    Args:
+        commodity_name: commodity name, as stored in sp_files
+        state_name: state name, as stored in sp_files
+        county_name: county name, as stored in sp_files
+
+    Returns:
+        available (year, s3_key) SP files for provided commodity, state and county
+    """
+    key = (commodity_name.lower(), state_name.lower(), county_name.lower())
+    sp_files = sp_file_index.get(*key)
+    if sp_files is not None:
+        return sp_files
+
+    # index is unavailable, query database directly
+    with get_engine().connect() as connection:
+        rows = connection.execute(
+            SP_FILES_QUERY,
+            {"commodity_name": key[0], "state_name": key[1], "county_name": key[2]},
+        ).fetchall()
+    return [(int(year), s3_key) for year, s3_key in rows]
+
+
+def get_sp_pages(s3_key: str) -> List[str]:
+    """
+    Reads pre-extracted text from SP pages table, SP documents that are missing from it (e.g.
+    added since the last build) are downloaded and parsed through the local SP document cache.
+
+    Args:
+        s3_key: S3 key of SP document
+
+    Returns:
+        cleaned text of each page of SP document
+    """
+    try:
+        with get_engine().connect() as connection:
+            rows = connection.execute(
+                text(f"SELECT content FROM {SP_PAGES_TABLE} WHERE s3_key = :s3_key ORDER BY page_number"),
+                {"s3_key": s3_key},
+            ).fetchall()
+    except SQLAlchemyError as e:
+        logger.warning(f"Unable to read {s3_key} from {SP_PAGES_TABLE} table : {e}")
+        rows = []
+
+    if rows:
+        return [row[0] for row in rows]
+
+    logger.info(f"{s3_key} not found in {SP_PAGES_TABLE} table, reading it from S3")
+    return sp_document_cache.get_pages(SP_BUCKET, s3_key)
+
+
+def get_sp_passages(s3_key: str, question: str, top_n: int = 5, passage_words: int = 150) -> List[Passage]:
+    """
+    Ranks passages of a SP document against provided question, with a local BM25 scorer, so that
+    only the relevant parts of the document end up in the prompt.
+
+    Args:
+        s3_key: S3 key of SP document
+        question: question (or topic) to look up in SP document
+        top_n: maximum number of passages to return
+        passage_words: number of words per passage, pages are split into passages of that size
+
+    Returns:
+        most relevant passages of SP document, in document order
+    """
+    cache_key = (s3_key, passage_words)
+    cached = _passages_cache.get(cache_key)
+    if cached is None:
+        passages = []
+        for page_number, page in enumerate(get_sp_pages(s3_key), start=1):
+            words = page.split()
+            for start in range(0, len(words), passage_words):
+                passages.append(Passage(page_number, " ".join(words[start:start + passage_words])))
+        cached = (passages, BM25([passage.content for passage in passages]))
+        _passages_cache.set(cache_key, cached)
+
+    passages, bm25 = cached
+    top_indices = bm25.get_top_n(question, top_n)
+    return [passages[i] for i in sorted(top_indices)]
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+# outcomes of a branch started speculatively
+WON = "won"
+CANCELLED = "cancelled"
+DISCARDED = "discarded"
+
+
+class SpeculationMetrics:
+    """
+    Thread safe counters of the branches started speculatively, and of the time spent running the
+    losing ones (i.e. the wasted spend).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.wasted_seconds: Dict[str, float] = {}
+
+    def record(self, branch: str, outcome: str, elapsed: float = 0.0) -> None:
+        """
+        Args:
+            branch: name of the branch
+            outcome: WON, CANCELLED (stopped before completion) or DISCARDED (completed, result unused)
+            elapsed: time the branch ran for, in seconds, counted as wasted unless it won
+        """
+        with self._lock:
+            branch_counts = self.counts.setdefault(branch, {WON: 0, CANCELLED: 0, DISCARDED: 0})
+            branch_counts[outcome] += 1
+            if outcome != WON:
+                self.wasted_seconds[branch] = self.wasted_seconds.get(branch, 0.0) + elapsed
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns:
+            per branch counters, useful for logging and monitoring
+        """
+        with self._lock:
+            return {
+                branch: dict(branch_counts, wasted_seconds=round(self.wasted_seconds.get(branch, 0.0), 3))
+                for branch, branch_counts in self.counts.items()
+            }
+
+
+class SpeculativeRouter:
+    """
+    Runs a routing runnable and the branches it chooses from at the same time, so that latency is
+    bounded by max(route, branch) rather than route + branch. Once the route is known, losing branches
+    are cancelled (async) or left to finish in the background with their result discarded (sync,
+    threads cannot be interrupted).
+    """
+
+    def __init__(self,
+                 route: Runnable,
+                 branches: Dict[str, Runnable],
+                 select: Callable[[Any], str],
+                 speculative: Optional[List[str]] = None,
+                 metrics: Optional[SpeculationMetrics] = None,
+                 max_workers: int = 16) -> None:
+        """
+        Args:
+            route: runnable deciding the branch
+            branches: runnables to choose from, by name, all taking the same input as route
+            select: maps the output of route to a branch name
+            speculative: names of the branches started along with route, defaults to all of them,
+                others are only started once chosen
+            metrics: counters the speculation outcomes are recorded to
+            max_workers: number of threads running sync branches
+        """
+        self.route = route
+        self.branches = branches
+        self.select = select
+        self.speculative = list(branches) if speculative is None else speculative
+        self.metrics = metrics or SpeculationMetrics()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative")
+
+    def invoke(self, input: Dict, config: RunnableConfig) -> Any:
+        runs = {name: _BranchRun() for name in self.speculative}
+        futures: Dict[str, Future] = {
+            name: self._executor.submit(runs[name].call, self.branches[name].invoke, input, config)
+            for name in self.speculative
+        }
+        try:
+            chosen = self.select(self.route.invoke(input, config))
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+
+        for name, future in futures.items():
+            if name == chosen:
+                continue
+            if future.cancel():
+                self.metrics.record(name, CANCELLED, 0.0)
+            else:
+                # already running, its result is discarded once done
+                future.add_done_callback(
+                    lambda _, name=name: self.metrics.record(name, DISCARDED, runs[name].elapsed())
+                )
+
+        if chosen in futures:
+            self.metrics.record(chosen, WON)
+            return futures[chosen].result()
+        return self.branches[chosen].invoke(input, config)
+
+    async def ainvoke(self, input: Dict, config: RunnableConfig) -> Any:
+        runs = {name: _BranchRun() for name in self.speculative}
+        tasks: Dict[str, asyncio.Task] = {
+            name: asyncio.create_task(runs[name].acall(self.branches[name].ainvoke, input, config))
+            for name in self.speculative
+        }
+        try:
+            chosen = self.select(await self.route.ainvoke(input, config))
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        for name, task in tasks.items():
+            if name == chosen:
+                continue
+            outcome = DISCARDED if task.done() else CANCELLED
+            task.cancel()
+            # an exception of a losing branch is irrelevant, retrieving it avoids an asyncio warning
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self.metrics.record(name, outcome, runs[name].elapsed())
+
+        if chosen in tasks:
+            self.metrics.record(chosen, WON)
+            return await tasks[chosen]
+        return await self.branches[chosen].ainvoke(input, config)
+
+
+class _BranchRun:
+    """
+    Start and end times of a branch run, so that its own running time (and not the route's) is counted.
+    """
+
+    def __init__(self) -> None:
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def call(self, func: Callable, *args) -> Any:
+        self.started_at = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.finished_at = time.perf_counter()
+
+    async def acall(self, func: Callable, *args) -> Any:
+        self.started_at = time.perf_counter()
+        try:
+            return await func(*args)
+        finally:
+            self.finished_at = time.perf_counter()
+
+    def elapsed(self) -> float:
+        """
+        Returns:
+            running time of the branch so far, in seconds, 0 if it did not start
+        """
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at if self.finished_at is not None else time.perf_counter()) - self.started_at
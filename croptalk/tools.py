@@ -1,20 +1,16 @@
-import difflib
 import logging
 import os
 import re
+import threading
 from typing import List, Dict
 from typing import Optional
 
-import pandas as pd
-import requests
 from dotenv import load_dotenv
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain.tools import tool
 from langchain.tools.render import render_text_description
 from langchain_community.agent_toolkits import create_sql_agent
 from langchain_community.utilities import SQLDatabase
-from langchain_community.vectorstores import FAISS
-from langchain_core.example_selectors import SemanticSimilarityExampleSelector
 from langchain_core.prompts import (
     ChatPromptTemplate,
     FewShotPromptTemplate,
@@ -22,51 +18,47 @@ from langchain_core.prompts import (
     PromptTemplate,
     SystemMessagePromptTemplate,
 )
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 from langchain_openai import OpenAIEmbeddings
-from sqlalchemy import create_engine, text
 
-from croptalk.utils import read_pdf_from_s3, remove_long_words
+from croptalk.commodities import COMMODITY_LIST, commodity_matcher
+from croptalk.example_selector import load_example_selector
+from croptalk.name_index import NameIndex, get_name_index
+from croptalk.sob_cache import normalize_question, sob_question_cache
+from croptalk.sob_database import get_sob_database
+from croptalk.sob_rollups import describe_rollups, find_rollup
+from croptalk.sp_documents import get_sp_files, get_sp_passages
+from croptalk.wfrp import fetch_wfrp_commodities
 
 load_dotenv("secrets/.env.secret")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
-postgres_uri = os.environ.get('POSTGRES_URI_READ_ONLY')
-DB = SQLDatabase.from_uri(postgres_uri)
-
 load_dotenv("secrets/.env.secret")
 load_dotenv("secrets/.env.shared")
 
-COMMODITY_LIST = ['Wheat', 'Pecans', 'Cotton', 'Peaches', 'Corn', 'Peanuts', 'Whole Farm Revenue Protection',
-                  'Soybeans', 'Pasture,Rangeland,Forage', 'Sesame', 'Controlled Environment', 'Apiculture', 'Hemp',
-                  'Micro Farm', 'Blueberries', 'Oats', 'Fresh Market Sweet Corn', 'Grain Sorghum', 'Potatoes',
-                  'Oysters', 'Triticale', 'Cucumbers', 'Canola', 'Popcorn', 'Fresh Market Tomatoes', 'Feeder Cattle',
-                  'Fed Cattle', 'Cattle', 'Weaned Calves', 'Swine', 'Milk', 'Dairy Cattle', 'Forage Production',
-                  'Dry Peas', 'Barley', 'Cabbage', 'Onions', 'Cotton Ex Long Staple', 'Chile Peppers', 'Dry Beans',
-                  'Apples', 'Pistachios', 'Grapefruit', 'Lemons', 'Tangelos', 'Oranges', 'Mandarins/Tangerines', 'Rice',
-                  'Hybrid Seed Rice', 'Grapes', 'Forage Seeding', 'Walnuts', 'Almonds', 'Prunes', 'Safflower',
-                  'Cherries', 'Processing Cling Peaches', 'Kiwifruit', 'Olives', 'Tomatoes', 'Fresh Apricots',
-                  'Processing Apricots', 'Pears', 'Raisins', 'Table Grapes', 'Figs', 'Plums', 'Alfalfa Seed',
-                  'Strawberries', 'Tangelo Trees', 'Orange Trees', 'Grapefruit Trees', 'Lemon Trees',
-                  'Fresh Nectarines', 'Processing Freestone', 'Fresh Freestone Peaches', 'Mandarin/Tangerine Trees',
-                  'Pomegranates', 'Sugar Beets', 'Grapevine', 'Cultivated Wild Rice', 'Mint', 'Avocados', 'Caneberries',
-                  'Millet', 'Sunflowers', 'Annual Forage', 'Nursery (NVS)', 'Silage Sorghum', 'Hybrid Sweet Corn Seed',
-                  'Cigar Binder Tobacco', 'Cigar Wrapper Tobacco', 'Sweet Corn', 'Processing Beans', 'Green Peas',
-                  'Flue Cured Tobacco', 'Tangors', 'Peppers', 'Sugarcane', 'Macadamia Nuts', 'Macadamia Trees',
-                  'Banana', 'Coffee', 'Papaya', 'Banana Tree', 'Coffee Tree', 'Papaya Tree', 'Hybrid Popcorn Seed',
-                  'Mustard', 'Grass Seed', 'Flax', 'Hybrid Corn Seed', 'Pumpkins', 'Burley Tobacco',
-                  'Hybrid Sorghum Seed', 'Camelina', 'Dark Air Tobacco', 'Fire Cured Tobacco', 'Sweet Potatoes',
-                  'Maryland Tobacco', 'Cranberries', 'Clams', 'Buckwheat', 'Rye', 'Fresh Market Beans', 'Clary Sage',
-                  'Hybrid Vegetable Seed', 'Cigar Filler Tobacco', 'Tangerine Trees', 'Lime Trees']
+
+def get_name_index_or_none() -> Optional[NameIndex]:
+    """
+    Returns:
+        the name index, None if it could not be loaded (e.g. database unreachable), so that tools still
+        answer from the names or codes provided by the agent
+    """
+    try:
+        return get_name_index()
+    except Exception as e:
+        logger.warning(f"Unable to load the name index, names are used as provided : {e}")
+        return None
 
 
 @tool("get-SP-doc")
 def get_sp_document(state: Optional[str] = None,
                     county: Optional[str] = None,
                     commodity: Optional[str] = None,
-                    year: Optional[int] = None):
+                    year: Optional[int] = None,
+                    question: Optional[str] = None):
     """
     County specific insurance question should be answered with this tool. It allows to retrieve
     information the specific way a policy works within a county (prices, dates, rules).
@@ -81,65 +73,65 @@ def get_sp_document(state: Optional[str] = None,
     county_name: name of county provided
     commodity_name: name of commodity
     year: year of document
+    question: what to look up within the document, ex : "final planting date for organic cotton", should always be
+        provided, only the passages relevant to it are returned
 
     Returns: str
     """
 
     if all([state, county, commodity]):
-        # use chain to retrieve correct commodity info
-        # we use a chain in this case because commodity is not easily retrieved by the agent in the correct format
-        commodity = difflib.get_close_matches(commodity, COMMODITY_LIST, cutoff=0.1)[0]
-        county = county.lower().replace("county", "")
-
-        # Define your database connection URL
-        db_url = os.environ["POSTGRES_URI"]
-
-        # Create the SQLAlchemy engine
-        engine = create_engine(db_url)
-
-        # Define your SQL query
-        sql_query = f"""
-           SELECT s3_key, year
-           FROM sp_files
-           WHERE commodity_name = '{commodity.lower()}' AND
-           state_name = '{state.lower()}' AND 
-           county_name = '{county.lower()}'
-           """
-
-        # Execute the SQL query
-        with engine.connect() as connection:
-            result = connection.execute(text(sql_query))
-            rows = result.fetchall()
-
-        s3_keys = pd.DataFrame(rows)
-        if s3_keys.empty:
+        # resolve names provided by the agent to official names, as stored in sp_files
+        name_index = get_name_index_or_none()
+        if name_index is not None:
+            state_entry = name_index.find_state(state)
+            county_entry = name_index.find_county(county, state)
+            commodity_entry = name_index.find_commodity(commodity)
+            if not all([state_entry, county_entry, commodity_entry]):
+                return (f"My search results indicate that there is no Special Provision (SP) document for the "
+                        f"corresponding commodity ({commodity}), state ({state}),and county ({county}). \b"
+                        "Make sure you are providing available commodity, state and county.")
+            state, county, commodity = state_entry.name, county_entry.name, commodity_entry.name
+        else:
+            # best effort without the index, the commodity list is local
+            commodity = commodity_matcher.match(commodity) or commodity
+            county = re.sub(r"\bcounty\b", "", county, flags=re.IGNORECASE).strip()
+
+        # served from the in-memory sp_files index, refreshed periodically
+        sp_files = get_sp_files(commodity_name=commodity, state_name=state, county_name=county)
+        if not sp_files:
             return (f"My search results indicate that there is no Special Provision (SP) document for the "
                     f"corresponding commodity ({commodity}), state ({state}),and county ({county}). \b"
                     "Make sure you are providing available commodity, state and county.")
 
+        years = sorted({sp_file_year for sp_file_year, _ in sp_files})
         if not year:
             # take document in latest year
-            s3_keys = s3_keys[s3_keys["year"] == s3_keys["year"].max()]
+            doc_year = years[-1]
         else:
-            years = s3_keys["year"].unique()
-            s3_keys = s3_keys[s3_keys["year"] == year]
-            if s3_keys.empty:
+            doc_year = int(year)
+            if doc_year not in years:
                 return ("My search results indicate that there are no Special Provision (SP) documents for the county,"
                         " state and commodity you requested. However, there are none for this specific year. "
                         f"Here is the list of available years for the requested SP document : {years}")
 
-        doc_link = s3_keys["s3_key"].values[0]
+        doc_link = next(s3_key for sp_file_year, s3_key in sp_files if sp_file_year == doc_year)
 
         message = f"The Special provision (SP) document for "
         if year:
             message += f"year {year},"
 
-        sp_content = read_pdf_from_s3("croptalk-spoi", doc_link)
-        sp_content = remove_long_words(sp_content)
-
         message += (f"{commodity}, {state} and {county} county can be found at the following "
                     f"link : https://croptalk-spoi.s3.us-east-2.amazonaws.com/{doc_link}. ")
-        message += "Here is the document content : " + sp_content
+
+        # text is pre-extracted offline (see create_sp_text_data.py)
+        # only the passages relevant to the question are returned, never the whole document. Without a
+        # question, passages are ranked against the requested commodity and location
+        sp_passages = get_sp_passages(doc_link,
+                                      question or f"{commodity} {county} county {state}",
+                                      top_n=int(os.getenv("SP_TOP_PASSAGES", 5)))
+        if sp_passages:
+            message += "Here are the most relevant passages of the document : "
+            message += " ".join(f"[page {passage.page_number}] {passage.content}" for passage in sp_passages)
 
         return message
 
@@ -163,6 +155,10 @@ def get_sp_document(state: Optional[str] = None,
 class SQLHandler(BaseCallbackHandler):
     def __init__(self):
         self.sql_result = []
+        self.executed_queries = []
+        # whether the last executed query returned data rather than a database error, None if none ran
+        self.last_query_succeeded = None
+        self._query_run_ids = set()
 
     def on_agent_action(self, action, **kwargs):
         """Run on agent action. if the tool being used is sql_db_query,
@@ -172,6 +168,23 @@ class SQLHandler(BaseCallbackHandler):
         if action.tool in ["sql_db_query_checker", "sql_db_query"]:
             self.sql_result.append(action.tool_input)
 
+        if action.tool == "sql_db_query":
+            tool_input = action.tool_input
+            self.executed_queries.append(tool_input["query"] if isinstance(tool_input, dict) else tool_input)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        if serialized.get("name") == "sql_db_query":
+            self._query_run_ids.add(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        """sql_db_query reports database errors as its output, starting with "Error" """
+        if run_id in self._query_run_ids:
+            self.last_query_succeeded = not str(output).startswith("Error")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        if run_id in self._query_run_ids:
+            self.last_query_succeeded = False
+
 
 @tool("get-SOB-metrics-using-SQL-agent")
 def get_sob_metrics_sql_agent(input: str) -> str:
@@ -194,17 +207,13 @@ def get_sob_metrics_sql_agent(input: str) -> str:
     Returns: str
     """
     try:
-        # this does not work with gpt-4
-        llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
-
-        agent = create_sql_agent(
-            llm=llm,
-            db=DB,
-            prompt=full_prompt,
-            tools=[validate_query],
-            verbose=True,
-            agent_type="openai-tools",
-        ).with_config(run_name="SQLAgentExecutor")
+        # repeated questions skip the agent, and get the same answer as the first time
+        question_key = normalize_question(input)
+        cached_answer = sob_question_cache.get(question_key)
+        if cached_answer is not None:
+            return cached_answer
+
+        agent = get_sob_sql_agent()
 
         handler = SQLHandler()
 
@@ -214,7 +223,14 @@ def get_sob_metrics_sql_agent(input: str) -> str:
                                  "agent_scratchpad": [],
                                  }, {"callbacks": [handler]})["output"]
 
-        return f"SQL query : {handler.sql_result}, Output :  {response}"
+        answer = f"SQL query : {handler.sql_result}, Output :  {response}"
+
+        # only answers backed by a successful query are cached
+        if (handler.executed_queries and handler.last_query_succeeded
+                and is_read_only_query(handler.executed_queries[-1])):
+            sob_question_cache.set(question_key, answer)
+
+        return answer
 
     except SQLStatementNotAllowed:
         return "Only read operations are allowed."
@@ -223,12 +239,62 @@ def get_sob_metrics_sql_agent(input: str) -> str:
         return "There was an Error in SQL tool."
 
 
+_db = None
+_db_lock = threading.Lock()
+
+_sob_sql_agent = None
+_sob_sql_agent_lock = threading.Lock()
+
+
+def get_db() -> SQLDatabase:
+    """
+    Reflecting the database schema requires a connection, it is not done at import.
+
+    Returns:
+        the database queried by the SOB SQL agent, Postgres or local DuckDB snapshot of SOB data (see
+        SOB_BACKEND), created on first call
+    """
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = get_sob_database()
+    return _db
+
+
+def get_sob_sql_agent() -> Runnable:
+    """
+    The agent only holds configuration (LLM client, database, prompt, tools), it can safely be shared
+    across tool calls, per-call state is isolated through the callbacks provided at invocation.
+
+    Returns:
+        the SOB SQL agent executor, built on first call
+    """
+    global _sob_sql_agent
+    if _sob_sql_agent is None:
+        with _sob_sql_agent_lock:
+            if _sob_sql_agent is None:
+                # this does not work with gpt-4
+                llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+                db = get_db()
+
+                _sob_sql_agent = create_sql_agent(
+                    llm=llm,
+                    db=db,
+                    prompt=get_sob_sql_prompt(db),
+                    tools=[validate_query],
+                    verbose=True,
+                    agent_type="openai-tools",
+                ).with_config(run_name="SQLAgentExecutor")
+    return _sob_sql_agent
+
+
 class SQLStatementNotAllowed(Exception):
     """Raise for my specific kind of exception"""
 
 
 @tool("validate-sql_query")
-def validate_query(output: str) -> None:
+def validate_query(output: str) -> Optional[str]:
     """
     This tool should be used for EVERY sql query. It is meant to validate that the query does not contain
     any dangerous statements.
@@ -236,16 +302,26 @@ def validate_query(output: str) -> None:
     Args:
         output: SQL query
 
-    Returns: None
+    Returns: Optional[str], a hint to rewrite the query against a faster summary table
     """
+    if not is_read_only_query(output):
+        raise SQLStatementNotAllowed
+
+    # steer the agent toward pre-aggregated data, rather than scanning the whole fact table
+    rollup = find_rollup(output, get_db().get_usable_table_names())
+    if rollup is not None:
+        return f"This query can be answered from the {rollup.table} summary table, which is much faster to " \
+               f"query than sob_all_years, rewrite it against {rollup.table}."
+
+
+def is_read_only_query(query: str) -> bool:
     # Define the regex pattern to match SQL operations
     pattern = r'\b(?:INSERT|UPDATE|DELETE|CREATE|DROP|ALTER)\b'
 
     # Use re.search to check if the pattern is found in the query
-    match = re.search(pattern, output, re.IGNORECASE)  # Use IGNORECASE flag to ignore case sensitivity
+    match = re.search(pattern, query, re.IGNORECASE)  # Use IGNORECASE flag to ignore case sensitivity
 
-    if match:
-        raise SQLStatementNotAllowed
+    return match is None
 
 
 @tool("wfrp-commodities-tool")
@@ -266,29 +342,24 @@ def get_wfrp_commodities(reinsurance_yr: str, state_code: str, county_code: str)
 
     Returns: Optional[str]
     """
-    url = f"http://dev.lookup-api.cropguard.online/v1/lookups/GetWFRPCommodities"
-    headers = {
-        'accept': 'application/json',
-        'api-key': os.environ["CROPGUARD_API_KEY"],
-        'Content-Type': 'application/json'
-    }
-
-    response = requests.post(url, headers=headers, json={"ReinsuranceYear": reinsurance_yr,
-                                                         "StateCode": state_code,
-                                                         "CountyCode": county_code})
-
-    if response.status_code == 200:
-        print("API call successful")
-        response_data = response.json()
-        # Process the response data as needed
-        commodity_list = [i["AGR Commodity Name"] for i in response_data]
-        return f"Available commodities for the WFRP program (year {reinsurance_yr}, state_code {state_code}, and " \
-               f"county_code {county_code}) are : " + str(commodity_list)
-
-    else:
-        print("API call failed with status code:", response.status_code)
+    # the agent sometimes provides state and county names instead of codes, they are sent as is when the
+    # index is not available
+    name_index = get_name_index_or_none()
+    state_entry = name_index.find_state(state_code) if name_index is not None else None
+    if state_entry is not None:
+        state_code = state_entry.code
+        county_entry = name_index.find_county(county_code, state_code)
+        if county_entry is not None:
+            county_code = county_entry.code
+
+    # responses are cached, see croptalk/wfrp.py
+    commodity_list = fetch_wfrp_commodities(reinsurance_yr, state_code, county_code)
+    if commodity_list is None:
         return None
 
+    return f"Available commodities for the WFRP program (year {reinsurance_yr}, state_code {state_code}, and " \
+           f"county_code {county_code}) are : " + str(commodity_list)
+
 
 def get_sob_sql_query_examples() -> List[Dict]:
     return [
@@ -335,7 +406,7 @@ def get_sob_sql_query_examples() -> List[Dict]:
     ]
 
 
-system_prefix = """You are an agent designed to interact with a SQL database.
+SYSTEM_PREFIX_TEMPLATE = """You are an agent designed to interact with a SQL database.
 Given an input question, create a syntactically correct {dialect} query to run, then look at the results of the query and return the answer.
 Unless the user specifies a specific number of examples they wish to obtain, always limit your query to at most {top_k} results.
 You can order the results by a relevant column to return the most interesting examples in the database.
@@ -344,7 +415,8 @@ You have access to tools for interacting with the database.
 Only use the given tools. Only use the information returned by the tools to construct your final answer.
 You MUST double check your query before executing it. If you get an error while executing a query, rewrite the query and try again.
 
-Always use the sob_all_years table. 
+Always use the sob_all_years table, or one of its summary tables. 
+{rollups_description}
 
 If a question is about an average, make sure to weight the metric by policy_sold_count.
 
@@ -354,33 +426,47 @@ If the question does not seem related to the database, just return "I don't know
 
 Here are some examples of user inputs and their corresponding SQL queries:"""
 
-examples = get_sob_sql_query_examples()
 
-example_selector = SemanticSimilarityExampleSelector.from_examples(
-    examples,
-    OpenAIEmbeddings(openai_api_key=os.environ["OPENAI_API_KEY"]),
-    FAISS,
-    k=5,
-    input_keys=["input"],
-)
+def get_sob_sql_prompt(db: SQLDatabase) -> ChatPromptTemplate:
+    """
+    Args:
+        db: database queried by the SOB SQL agent, its summary tables are described in the prompt
 
-few_shot_prompt = FewShotPromptTemplate(
-    example_selector=example_selector,
-    example_prompt=PromptTemplate.from_template(
-        "User input: {input}\nSQL query: {query}"
-    ),
-    input_variables=["input", "dialect", "top_k"],
-    prefix=system_prefix,
-    suffix="",
-)
+    Returns:
+        SOB SQL agent prompt, with few-shot examples selected by similarity with the question
+    """
+    # examples are only embedded when they change, the persisted index is loaded otherwise
+    example_selector = load_example_selector(
+        get_sob_sql_query_examples(),
+        OpenAIEmbeddings(openai_api_key=os.environ["OPENAI_API_KEY"]),
+        index_dir=os.getenv("SOB_EXAMPLES_INDEX_DIR", "data/sob_examples_index"),
+        k=5,
+        input_keys=["input"],
+    )
+
+    # dialect and top_k are prompt variables, the prefix cannot be an f-string
+    system_prefix = SYSTEM_PREFIX_TEMPLATE.replace(
+        "{rollups_description}", describe_rollups(db.get_usable_table_names())
+    )
+
+    few_shot_prompt = FewShotPromptTemplate(
+        example_selector=example_selector,
+        example_prompt=PromptTemplate.from_template(
+            "User input: {input}\nSQL query: {query}"
+        ),
+        input_variables=["input", "dialect", "top_k"],
+        prefix=system_prefix,
+        suffix="",
+    )
+
+    return ChatPromptTemplate.from_messages(
+        [
+            SystemMessagePromptTemplate(prompt=few_shot_prompt),
+            ("human", "{input}"),
+            MessagesPlaceholder("agent_scratchpad"),
+        ]
+    )
 
-full_prompt = ChatPromptTemplate.from_messages(
-    [
-        SystemMessagePromptTemplate(prompt=few_shot_prompt),
-        ("human", "{input}"),
-        MessagesPlaceholder("agent_scratchpad"),
-    ]
-)
 
 TOOLS = [get_sob_metrics_sql_agent, get_wfrp_commodities, get_sp_document]
 RENDERED_TOOLS = render_text_description(TOOLS)
@@ -14,23 +14,30 @@ def initialize_llm(model):
     )
 
 
-def read_pdf_from_s3(bucket_name, file_key):
-    # Initialize S3 client
-    s3 = boto3.client('s3',
-                      aws_access_key_id=os.environ["AWS_ACCESS_KEY_ID"],
-                      aws_secret_access_key=os.environ["AWS_SECRET_ACCESS_KEY"])
+_s3_client = None
 
-    # Download PDF file from S3
-    response = s3.get_object(Bucket=bucket_name, Key=file_key)
-    pdf_data = response['Body'].read()
 
-    # Read text content from the PDF
-    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_data))
-    text_content = ''
-    for page_num in range(len(pdf_reader.pages)):
-        text_content += pdf_reader.pages[page_num].extract_text()
+def get_s3_client():
+    """
+    Requires the following environment variables to be set:
+        - AWS_ACCESS_KEY_ID
+        - AWS_SECRET_ACCESS_KEY
+
+    Returns:
+        a S3 client, shared across calls (boto3 clients are thread safe)
+    """
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client('s3',
+                                  aws_access_key_id=os.environ["AWS_ACCESS_KEY_ID"],
+                                  aws_secret_access_key=os.environ["AWS_SECRET_ACCESS_KEY"])
+    return _s3_client
 
-    return text_content
+
+def extract_pdf_pages(pdf_data):
+    # Read text content from the PDF, page by page
+    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_data))
+    return [page.extract_text() for page in pdf_reader.pages]
 
 
 def remove_long_words(text, character_len=30):
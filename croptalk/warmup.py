@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+class WarmUp:
+    """
+    Runs named initialization tasks (connections, indexes, agents, canary queries...) concurrently,
+    in threads, and keeps track of their status and latency. Resources are also initialized lazily
+    on first use, so a failed task is retried by the first request needing it.
+
+    The app is ready once every required task succeeded, optional tasks (e.g. monitoring) are reported
+    but never block readiness.
+    """
+
+    def __init__(self,
+                 tasks: Dict[str, Callable[[], Any]],
+                 optional_tasks: Optional[Dict[str, Callable[[], Any]]] = None) -> None:
+        """
+        Args:
+            tasks: blocking initialization functions of required dependencies, by name
+            optional_tasks: blocking initialization functions of optional dependencies, by name
+        """
+        self.tasks = {**tasks, **(optional_tasks or {})}
+        self.optional = set(optional_tasks or {})
+        self.statuses = {name: PENDING for name in self.tasks}
+        self.latencies: Dict[str, float] = {}
+        self.done = False
+        self.running = False
+
+    @property
+    def ready(self) -> bool:
+        """
+        Returns:
+            whether warm-up is done and every required task succeeded
+        """
+        return self.done and all(
+            status == READY for name, status in self.statuses.items() if name not in self.optional
+        )
+
+    def failed_required(self) -> List[str]:
+        """
+        Returns:
+            names of the required tasks that failed
+        """
+        return [name for name, status in self.statuses.items()
+                if name not in self.optional and status.startswith(FAILED)]
+
+    async def run(self, names: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Args:
+            names: tasks to run, defaults to all of them, e.g. failed ones to retry them
+
+        Returns:
+            status of each task once they are all done
+        """
+        tasks = {name: task for name, task in self.tasks.items() if names is None or name in names}
+        self.running = True
+        try:
+            # one thread per task, the default executor may have fewer workers than tasks
+            with ThreadPoolExecutor(max_workers=max(len(tasks), 1), thread_name_prefix="warm-up") as executor:
+                await asyncio.gather(*(self._run_task(name, task, executor) for name, task in tasks.items()))
+        finally:
+            self.running = False
+        self.done = True
+        logger.info(f"Warm-up done : {self.report()}")
+        return self.statuses
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns:
+            status, latency (in milliseconds, once done) and whether it is required, of each task
+        """
+        return {
+            name: {"status": status,
+                   "latency_ms": round(self.latencies[name] * 1000) if name in self.latencies else None,
+                   "required": name not in self.optional}
+            for name, status in self.statuses.items()
+        }
+
+    async def _run_task(self, name: str, task: Callable[[], Any], executor: ThreadPoolExecutor) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(executor, task)
+            self.statuses[name] = READY
+        except Exception as e:
+            logger.exception(f"Warm-up of {name} failed")
+            self.statuses[name] = f"{FAILED}: {e}"
+        self.latencies[name] = time.perf_counter() - start
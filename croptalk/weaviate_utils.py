@@ -1,5 +1,8 @@
+import asyncio
 import os
-from typing import Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import weaviate
 import weaviate.classes as wvc
@@ -7,13 +10,23 @@ from weaviate.client import WeaviateClient
 from weaviate.collections.classes.internal import QueryReturn
 from weaviate.collections.collection import Collection
 
+from croptalk.cache import TTLCache
+from croptalk.filter_utils import (
+    get_filter_cache_stats,
+    is_valid_filter_value,
+    resolve_filter_codes,
+)
 
-from dsmain.dataapi.lookups import CommodityLookup, StateLookup, CountyLookup
+# compiled filters, keyed on resolved codes, document category and include_common_docs
+compiled_filter_cache = TTLCache(max_size=1024, ttl=None)
+_NOT_COMPILED = object()
 
-
-state_lookup = StateLookup(quiet_fail=True)
-county_lookup = CountyLookup(quiet_fail=True)
-commodity_lookup = CommodityLookup(quiet_fail=True)
+# the pinned weaviate client has no async API, async queries run on this pool and share the
+# connection of the collection they are issued on
+query_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("WEAVIATE_MAX_CONCURRENT_QUERIES", 16)),
+    thread_name_prefix="weaviate-query",
+)
 
 
 def get_weaviate_client() -> WeaviateClient:
@@ -98,6 +111,84 @@ def query_near_text_with_filters(
     return response
 
 
+async def aquery_near_text_with_filters(
+    get_collection: Callable[[], Collection],
+    query: str,
+    limit: int,
+    doc_category: Optional[str] = None,
+    commodity: Optional[str] = None,
+    county: Optional[str] = None,
+    state: Optional[str] = None,
+    include_common_docs: bool = True,
+) -> QueryReturn:
+    """
+    Asynchronous version of query_near_text_with_filters, the event loop is not blocked while
+    weaviate processes the query.
+
+    Args:
+        get_collection: returns the weaviate collection to run the query on, called from the worker
+                        thread as it may connect to weaviate first
+        query: query to use
+        limit: number of retrieved documents we are aiming for
+        doc_category: document category to filter on, None means no filter
+        commodity: commodity to filter on, None means no filter
+        county: county to filter on, None means no filter
+        state: state to filter on, None means no filter
+        include_common_docs: whether (default) or not to include documents that apply to all
+                             states, counties or commodities... does not apply to document category
+                             filter
+
+    Returns:
+        weaviate query response
+    """
+    def _query() -> QueryReturn:
+        return query_near_text_with_filters(
+            collection=get_collection(),
+            query=query,
+            limit=limit,
+            doc_category=doc_category,
+            commodity=commodity,
+            county=county,
+            state=state,
+            include_common_docs=include_common_docs,
+        )
+
+    return await asyncio.get_running_loop().run_in_executor(query_executor, _query)
+
+
+def query_near_text_batch(
+    collection: Collection,
+    specs: List[Tuple[str, Dict[str, Any]]],
+    limit: int,
+) -> List[QueryReturn]:
+    """
+    Runs several filtered near text queries concurrently on the same collection (i.e. the same
+    client connection).
+
+    Args:
+        collection: the weaviate collection to run the queries on
+        specs: list of (query, filters) tuples, filters being a dict of query_near_text_with_filters
+               keyword arguments (doc_category, commodity, county, state, include_common_docs)
+        limit: number of retrieved documents we are aiming for, for each query
+
+    Returns:
+        weaviate query responses, in the same order as provided specs
+    """
+    futures = [
+        query_executor.submit(
+            partial(
+                query_near_text_with_filters,
+                collection=collection,
+                query=query,
+                limit=limit,
+                **filters,
+            )
+        )
+        for query, filters in specs
+    ]
+    return [future.result() for future in futures]
+
+
 def get_equal_filter(property_name: str, property_value: Any) -> wvc.query.Filter:
     """
     Args:
@@ -119,6 +210,8 @@ def create_weaviate_filter(
     include_common_docs: bool = True,
 ) -> Optional[wvc.query.Filter]:
     """
+    Compiled filters are cached, they are only read by weaviate queries and can safely be shared.
+
     Args:
         state: state to filter on, None means no filter
         county: county to filter on, None means no filter
@@ -132,9 +225,54 @@ def create_weaviate_filter(
         a weaviate filter
         See [the docs](https://weaviate.io/developers/weaviate/search/filters) for more details!
     """
-    def _is_valid(param_value: str) -> bool:
-        return param_value is not None and param_value.lower() != 'none'
+    codes = resolve_filter_codes(state=state, county=county, commodity=commodity)
+    doc_category = doc_category if is_valid_filter_value(doc_category) else None
+
+    cache_key = (codes, doc_category, include_common_docs)
+    # a cached filter can be None, hence the sentinel default
+    weaviate_filter = compiled_filter_cache.get(cache_key, _NOT_COMPILED)
+    if weaviate_filter is _NOT_COMPILED:
+        weaviate_filter = _compile_weaviate_filter(
+            state_code=codes.state,
+            county_code=codes.county,
+            commodity_code=codes.commodity,
+            doc_category=doc_category,
+            include_common_docs=include_common_docs,
+        )
+        compiled_filter_cache.set(cache_key, weaviate_filter)
+    return weaviate_filter
+
+
+def get_weaviate_filter_cache_stats() -> dict:
+    """
+    Returns:
+        compiled filter cache counters, along with codes cache counters and lookup misses
+    """
+    return {
+        "compiled_filters": compiled_filter_cache.stats(),
+        "codes": get_filter_cache_stats(),
+    }
+
+
+def _compile_weaviate_filter(
+    state_code: Optional[str],
+    county_code: Optional[str],
+    commodity_code: Optional[str],
+    doc_category: Optional[str],
+    include_common_docs: bool,
+) -> Optional[wvc.query.Filter]:
+    """
+    Args:
+        state_code: state lookup code to filter on, None means no filter
+        county_code: county lookup code to filter on, None means no filter
+        commodity_code: commodity lookup code to filter on, None means no filter
+        doc_category: document category to filter on, None means no filter
+        include_common_docs: whether or not to include documents that apply to all states, counties
+                             or commodities
 
+    Returns:
+        a weaviate filter
+    """
     def _get_integer_equal_filter(property_name: str, property_value: int) -> wvc.query.Filter:
         filter_value = get_equal_filter(property_name, property_value)
         if not include_common_docs:
@@ -149,38 +287,23 @@ def create_weaviate_filter(
     # add numerical conditions
     # note that ins plans, states, counties and commodities are stored as integers in weaviate
     # vector store, while they are 0-padded strings in lookups
-    if _is_valid(state):
-        try:
-            state_obj = state_lookup.find(state)
-        except:
-            state_obj = None
-        if state_obj:
-            filter_conditions.append(
-                _get_integer_equal_filter("state", int(state_obj.code))
-            )
+    if state_code:
+        filter_conditions.append(
+            _get_integer_equal_filter("state", int(state_code))
+        )
 
-    if _is_valid(county) and _is_valid(state):
-        try:
-            county_obj = county_lookup.find_by_name(county, state)
-        except:
-            county_obj = None
-        if county_obj:
-            filter_conditions.append(
-                _get_integer_equal_filter("county", int(county_obj.code))
-            )
+    if county_code:
+        filter_conditions.append(
+            _get_integer_equal_filter("county", int(county_code))
+        )
 
-    if _is_valid(commodity):
-        try:
-            commodity_obj = commodity_lookup.find(commodity)
-        except:
-            commodity_obj = None
-        if commodity_obj:
-            filter_conditions.append(
-                _get_integer_equal_filter("commodity", int(commodity_obj.code))
-            )
+    if commodity_code:
+        filter_conditions.append(
+            _get_integer_equal_filter("commodity", int(commodity_code))
+        )
 
     # add text conditions
-    if _is_valid(doc_category):
+    if doc_category is not None:
         filter_conditions.append(
             get_equal_filter("doc_category", doc_category)
         )
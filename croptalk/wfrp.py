@@ -0,0 +1,175 @@
+import argparse
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from croptalk.cache import PersistentTTLCache
+from croptalk.name_index import get_name_index
+
+load_dotenv("secrets/.env.secret")
+
+logger = logging.getLogger(__name__)
+
+WFRP_COMMODITIES_URL = "http://dev.lookup-api.cropguard.online/v1/lookups/GetWFRPCommodities"
+
+
+class LookupSettings(NamedTuple):
+    """
+    Timeouts and retries of lookup API requests.
+    """
+    # (connect, read) timeouts, in seconds
+    timeout: Tuple[float, float]
+    # retries on connection errors and transient statuses
+    retries: int
+
+
+# tool calls block the agent, a lookup gives up after about (retries + 1) * (connect + read) seconds
+INTERACTIVE_SETTINGS = LookupSettings(
+    timeout=(float(os.getenv("WFRP_CONNECT_TIMEOUT", 2)), float(os.getenv("WFRP_READ_TIMEOUT", 4))),
+    retries=int(os.getenv("WFRP_RETRIES", 1)),
+)
+# prefetch (see below) runs offline, it can wait for a slow lookup API
+PREFETCH_SETTINGS = LookupSettings(timeout=(3.05, 10), retries=3)
+
+# WFRP commodities of a county change about once a year
+wfrp_cache = PersistentTTLCache(
+    path=os.getenv("WFRP_CACHE_PATH", os.path.join(tempfile.gettempdir(), "croptalk", "wfrp_cache.sqlite")),
+    ttl=float(os.getenv("WFRP_CACHE_TTL", 30 * 24 * 3600)),
+)
+
+_sessions: Dict[LookupSettings, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(settings: LookupSettings = INTERACTIVE_SETTINGS) -> requests.Session:
+    """
+    Requires the following environment variable to be set:
+        - CROPGUARD_API_KEY
+
+    Args:
+        settings: retries of the session, timeouts are set on each request
+
+    Returns:
+        keep-alive session to the lookup API, with retries on connection errors and transient
+        statuses, shared across calls with the same settings
+    """
+    session = _sessions.get(settings)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(settings)
+            if session is None:
+                session = requests.Session()
+                # lookups are read only, retrying POST requests is safe
+                retry = Retry(
+                    total=settings.retries,
+                    backoff_factor=0.5,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=frozenset(["POST"]),
+                    # a Retry-After header could exceed the timeouts
+                    respect_retry_after_header=False,
+                )
+                session.mount("http://", HTTPAdapter(pool_maxsize=16, max_retries=retry))
+                session.mount("https://", HTTPAdapter(pool_maxsize=16, max_retries=retry))
+                session.headers.update({
+                    'accept': 'application/json',
+                    'api-key': os.environ["CROPGUARD_API_KEY"],
+                    'Content-Type': 'application/json'
+                })
+                _sessions[settings] = session
+    return session
+
+
+def fetch_wfrp_commodities(reinsurance_yr: str,
+                           state_code: str,
+                           county_code: str,
+                           settings: LookupSettings = INTERACTIVE_SETTINGS) -> Optional[List[str]]:
+    """
+    Args:
+        reinsurance_yr: year of reinsurance, ex : "2024"
+        state_code: state code, ex : "06"
+        county_code: county code, ex : "001"
+        settings: timeouts and retries of the lookup, defaults to the ones of tool calls
+
+    Returns:
+        available commodities for the WFRP program, None if the lookup API could not be reached
+    """
+    cache_key = f"{reinsurance_yr}/{state_code}/{county_code}"
+    commodity_list = wfrp_cache.get(cache_key)
+    if commodity_list is not None:
+        return commodity_list
+
+    try:
+        response = get_session(settings).post(WFRP_COMMODITIES_URL,
+                                              json={"ReinsuranceYear": reinsurance_yr,
+                                                    "StateCode": state_code,
+                                                    "CountyCode": county_code},
+                                              timeout=settings.timeout)
+    except requests.RequestException as e:
+        logger.warning(f"WFRP commodities lookup failed : {e}")
+        return None
+
+    if response.status_code != 200:
+        logger.warning(f"WFRP commodities lookup failed with status code : {response.status_code}")
+        return None
+
+    commodity_list = [i["AGR Commodity Name"] for i in response.json()]
+    wfrp_cache.set(cache_key, commodity_list)
+    return commodity_list
+
+
+def prefetch_state(reinsurance_yr: str, state: str, max_workers: int = 8) -> int:
+    """
+    Loads WFRP commodities of every county of a state into the cache, counties already cached are
+    skipped.
+
+    Args:
+        reinsurance_yr: year of reinsurance, ex : "2024"
+        state: state name, abbreviation or code
+        max_workers: number of concurrent lookups
+
+    Returns:
+        number of counties whose WFRP commodities are cached
+    """
+    name_index = get_name_index()
+    state_entry = name_index.find_state(state)
+    if state_entry is None:
+        raise ValueError(f"Unknown state : {state}")
+
+    county_codes = [county.code for county in name_index.get_counties(state_entry.code)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda county_code: fetch_wfrp_commodities(reinsurance_yr, state_entry.code, county_code,
+                                                       PREFETCH_SETTINGS),
+            county_codes,
+        ))
+    return sum(result is not None for result in results)
+
+
+def parse_args_prefetch() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "reinsurance_yr",
+        help="year of reinsurance, ex : 2024",
+    )
+    parser.add_argument(
+        "states",
+        help="states (names, abbreviations or codes) to prefetch",
+        nargs="+",
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args_prefetch()
+    for state in args.states:
+        nb_counties = prefetch_state(args.reinsurance_yr, state)
+        logger.info(f"Cached WFRP commodities of {nb_counties} counties of {state}")
@@ -8,6 +8,7 @@ from uuid import UUID
 import langsmith
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from langchain.globals import set_debug
 from langserve import add_routes
 from langsmith import Client
@@ -15,7 +16,13 @@ from pydantic.v1 import BaseModel
 from typing import Dict, Any
 
 
-from croptalk.model_openai_functions import model, memory
+from croptalk.model_openai_functions import document_retriever, model, model_factory, memory
+from croptalk.name_index import get_name_index
+from croptalk.sob_cache import invalidate_sob_caches
+from croptalk.sp_documents import SP_BUCKET, sp_file_index, warm_up_engine
+from croptalk.tools import get_db, get_sob_sql_agent
+from croptalk.utils import get_s3_client
+from croptalk.warmup import WarmUp
 
 set_debug(True)
 
@@ -40,6 +47,53 @@ class ChatRequest(BaseModel):
 add_routes(app, model, path="/chat",
            input_type=ChatRequest, config_keys=["metadata"])
 
+def warm_up_weaviate():
+    document_retriever.connect()
+    # canary retrieval, goes through weaviate query path and OpenAI vectorization
+    document_retriever.get_documents("crop insurance", top_k=1)
+
+
+def warm_up_sob_database():
+    # canary SQL query on SOB table
+    get_db().run("SELECT commodity_year FROM sob_all_years LIMIT 1")
+
+
+def warm_up_openai():
+    # opens the connection pool of the chat model client, listing models generates (and bills) nothing
+    model_factory.llm.client._client.models.list()
+
+
+# connections and indexes are created lazily, warm them up concurrently once the server is started
+warm_up = WarmUp({
+    "weaviate": warm_up_weaviate,
+    "postgres": warm_up_engine,
+    "sob_database": warm_up_sob_database,
+    "sob_sql_agent": get_sob_sql_agent,
+    "name_index": get_name_index,
+    "sp_file_index": sp_file_index.load,
+}, optional_tasks={
+    # monitoring, a bucket only read when an SP document is opened, and the chat model connection, only
+    # saving the first question a TLS handshake
+    "s3": lambda: get_s3_client().head_bucket(Bucket=SP_BUCKET),
+    "langsmith": lambda: client.info,
+    "openai": warm_up_openai,
+})
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    # not awaited, so that the server accepts requests (e.g. health checks) while warming up
+    app.state.warm_up_task = asyncio.create_task(warm_up.run())
+
+
+@app.get("/ready")
+async def ready():
+    if warm_up.done and not warm_up.running and warm_up.failed_required():
+        # retried in the background, so that the app becomes ready again once its dependencies are back
+        app.state.warm_up_task = asyncio.create_task(warm_up.run(warm_up.failed_required()))
+    code = 200 if warm_up.ready else 503
+    return JSONResponse(status_code=code, content={"ready": warm_up.ready, "dependencies": warm_up.report()})
+
 
 @app.post("/clear_memory")
 async def clear_memory():
@@ -57,6 +111,15 @@ async def clear_memory():
     return {"result": result, "code": code}
 
 
+@app.post("/clear_cache")
+async def clear_cache():
+    # to be called after the vectorstore collection has been re-ingested or SOB data refreshed
+    logging.info(f"CLEARING RETRIEVER CACHE : {document_retriever.cache_stats()}")
+    document_retriever.invalidate_cache()
+    invalidate_sob_caches()
+    return {"result": "success", "code": 200}
+
+
 class SendFeedbackBody(BaseModel):
     run_id: UUID
     key: str = "user_score"
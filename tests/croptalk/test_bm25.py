@@ -0,0 +1,35 @@
+import pytest
+
+from croptalk.bm25 import BM25, tokenize
+
+
+@pytest.fixture(scope="module")
+def bm25() -> BM25:
+    return BM25([
+        "The final planting date for cotton is May 31.",
+        "Organic cotton practices must be certified. The practice code for organic irrigated cotton is 002.",
+        "Grade discounts apply to wheat classes delivered below the base quality.",
+        "Premium billing date is August 15.",
+    ])
+
+
+def test_tokenize_removes_stop_words_and_punctuation():
+    assert tokenize("What is the final planting date?") == ["final", "planting", "date"]
+
+
+@pytest.mark.parametrize(
+    "question, expected_top",
+    [
+        ["What is the final planting date for cotton?", 0],
+        ["practice code for organic irrigated cotton", 1],
+        ["grade discount for wheat classes", 2],
+        ["When is the premium billing date?", 3],
+    ]
+)
+def test_get_top_n(bm25: BM25, question: str, expected_top: int):
+    assert bm25.get_top_n(question, n=2)[0] == expected_top
+
+
+def test_get_top_n_skips_non_matching_documents(bm25: BM25):
+    assert bm25.get_top_n("tobacco", n=3) == []
+    assert len(bm25.get_top_n("cotton", n=3)) == 2
@@ -0,0 +1,86 @@
+import pytest
+
+from croptalk.cache import PersistentTTLCache, TTLCache
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def timer() -> FakeTimer:
+    return FakeTimer()
+
+
+def test_get_counts_hits_and_misses(timer: FakeTimer):
+    cache = TTLCache(max_size=2, ttl=10, timer=timer)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(timer: FakeTimer):
+    cache = TTLCache(max_size=2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    timer.now = 9.9
+    assert cache.get("a") == 1
+    timer.now = 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(timer: FakeTimer):
+    cache = TTLCache(max_size=2, ttl=None, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # touch "a" so that "b" becomes the least recently used entry
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate(timer: FakeTimer):
+    cache = TTLCache(max_size=3, ttl=None, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        TTLCache(max_size=0)
+
+
+def test_persistent_cache_survives_new_instance(tmp_path, timer: FakeTimer):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PersistentTTLCache(path, ttl=10, timer=timer)
+    assert cache.get("2024/06/111") is None
+    cache.set("2024/06/111", ["Apples", "Avocados"])
+
+    reopened = PersistentTTLCache(path, ttl=10, timer=timer)
+    assert reopened.get("2024/06/111") == ["Apples", "Avocados"]
+    assert reopened.stats() == {"size": 1, "hits": 1, "misses": 0}
+
+
+def test_persistent_cache_entries_expire_after_ttl(tmp_path, timer: FakeTimer):
+    cache = PersistentTTLCache(str(tmp_path / "cache.sqlite"), ttl=10, timer=timer)
+    cache.set("a", 1)
+    timer.now = 10
+    assert cache.get("a", default="expired") == "expired"
+
+    cache.set("a", 2)
+    cache.invalidate()
+    assert cache.get("a") is None
@@ -0,0 +1,55 @@
+import pytest
+
+from croptalk import condense
+from croptalk.condense import CACHED, REPHRASED, STANDALONE, CondenseMetrics, is_follow_up
+from croptalk.entity_extractor import LocalEntityExtractor
+from croptalk.name_index import NameIndex
+
+
+@pytest.fixture(autouse=True)
+def local_extractor(monkeypatch):
+    extractor = LocalEntityExtractor(NameIndex(
+        states=[("53", "Washington", "WA"), ("06", "California", "CA")],
+        counties=[("53", "077", "Yakima"), ("06", "019", "Fresno")],
+        commodities=[("0054", "Apples"), ("0011", "Wheat")],
+    ))
+    monkeypatch.setattr(condense, "extract_entities_locally", extractor.extract)
+
+
+@pytest.mark.parametrize(
+    "question, last_question, expected",
+    [
+        # no previous question
+        ["What kind of losses are covered for apples?", None, False],
+        # previous question without entities
+        ["What kind of losses are covered for apples?", "What is the definition of a unit?", False],
+        # same entities mentioned again
+        ["What is the sales closing date for apples in Yakima county, Washington?",
+         "What kind of losses are covered for apples in Yakima county, Washington?", False],
+        # pronoun
+        ["What is the sales closing date for them?", "What kind of losses are covered for apples?", True],
+        ["Is it covered for this?", "What kind of losses are covered for apples?", True],
+        ["What is the sales closing date for the same county?", "What is covered for apples in Yakima?", True],
+        ["Also what is the sales closing date?", None, True],
+        # standalone questions with the same words
+        ["Is this policy available for apples in Washington?", None, False],
+        ["Is it possible to insure apples in Yakima county, Washington?", None, False],
+        ["What else is covered for wheat in Fresno county, California?", None, False],
+        ["Are apples also insurable in Fresno county, California?", None, False],
+        ["Are late planted apples covered the same as timely planted apples?", None, False],
+        # ellipsis
+        ["and for wheat?", "What kind of losses are covered for apples in Washington?", True],
+        ["wheat?", None, True],
+        # commodity of the previous question missing
+        ["What is the sales closing date in Washington?", "What kind of losses are covered for apples?", True],
+    ],
+)
+def test_is_follow_up(question, last_question, expected):
+    assert is_follow_up(question, last_question) == expected
+
+
+def test_condense_metrics():
+    metrics = CondenseMetrics()
+    for outcome in [STANDALONE, STANDALONE, CACHED, REPHRASED]:
+        metrics.record(outcome)
+    assert metrics.stats() == {STANDALONE: 2, CACHED: 1, REPHRASED: 1, "avoided": 3}
@@ -1,6 +1,11 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
 from dotenv import load_dotenv
 import pytest
 
+from croptalk import document_retriever, weaviate_utils
 from croptalk.document_retriever import DocumentRetriever
 from dsmain.dataapi.lookups import CommodityLookup, StateLookup, CountyLookup
 
@@ -244,3 +249,60 @@ def test_get_documents_with_all_filters(
         )
         for doc in res
     )
+
+
+@pytest.mark.parametrize(
+    "doc_category, commodity, state, county",
+    [
+        ["SP", "Apples", "West Virginia", "Putnam"],
+        [None, None, None, None],
+    ]
+)
+def test_aget_documents_matches_get_documents(
+    doc_retriever: DocumentRetriever,
+    doc_category: str,
+    commodity: str,
+    state: str,
+    county: str,
+):
+    kwargs = dict(
+        query="Any query",
+        doc_category=doc_category,
+        commodity=commodity,
+        county=county,
+        state=state,
+    )
+    doc_retriever.invalidate_cache()
+    async_res = asyncio.run(doc_retriever.aget_documents(**kwargs))
+    doc_retriever.invalidate_cache()
+    assert async_res == doc_retriever.get_documents(**kwargs)
+
+
+def test_get_documents_batch_matches_get_documents(doc_retriever: DocumentRetriever):
+    specs = [
+        ("Any query", {"doc_category": "SP", "commodity": "Apples", "state": "West Virginia", "county": "Putnam"}),
+        ("apples", {}),
+        ("Any query", {"state": "California", "include_common_docs": False}),
+    ]
+    doc_retriever.invalidate_cache()
+    batch_res = doc_retriever.get_documents_batch(specs, top_k=2)
+    doc_retriever.invalidate_cache()
+    assert batch_res == [doc_retriever.get_documents(query, top_k=2, **filters) for query, filters in specs]
+
+
+def test_aget_documents_connects_outside_of_event_loop(monkeypatch):
+    connect_threads = []
+
+    def get_client_collection(collection_name):
+        connect_threads.append(threading.current_thread())
+        return None, SimpleNamespace(name=collection_name)
+
+    monkeypatch.setattr(document_retriever, "get_client_collection", get_client_collection)
+    monkeypatch.setattr(weaviate_utils, "query_near_text_with_filters",
+                        lambda collection, **kwargs: SimpleNamespace(objects=[]))
+    # collection not initialised yet
+    retriever = DocumentRetriever(collection_name="croptalk1", cache_size=0)
+
+    assert asyncio.run(retriever.aget_documents(query="Any query")) == []
+    assert len(connect_threads) == 1
+    assert connect_threads[0] is not threading.main_thread()
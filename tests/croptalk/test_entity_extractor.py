@@ -0,0 +1,60 @@
+import pytest
+
+from croptalk import entity_extractor
+from croptalk.entity_extractor import LocalEntityExtractor, extract_entities_locally
+from croptalk.name_index import NameIndex
+
+
+@pytest.fixture(scope="module")
+def extractor() -> LocalEntityExtractor:
+    return LocalEntityExtractor(NameIndex(
+        states=[("53", "Washington", "WA"), ("36", "New York", "NY"), ("01", "Alabama", "AL"),
+                ("18", "Indiana", "IN"), ("41", "Oregon", "OR")],
+        counties=[("53", "077", "Yakima"), ("36", "063", "Niagara"), ("01", "003", "Baldwin"),
+                  ("01", "001", "Autauga"), ("41", "067", "Washington")],
+        commodities=[("0054", "Apples"), ("0020", "Pecans"), ("0011", "Wheat")],
+    ))
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ["are apples produced in yakima county washington?", ("Apples", "Washington", "Yakima", None, True)],
+        ["Apples Group A insurable varieties in Niagara NY", ("Apples", "New York", "Niagara", None, True)],
+        ["What is the Sales Closing Date for Pecans in Alabama, Baldwin", ("Pecans", "Alabama", "Baldwin", None, True)],
+        # no known commodity, it may be named in a way the gazetteer does not know
+        ["Show me sections of CIH related to optional units", (None, None, None, "CIH", False)],
+        ["What is the sales closing date for hazelnuts in Alabama?", (None, "Alabama", None, None, False)],
+        ["Is there a special provisions document for wheat in Autauga county Alabama?",
+         ("Wheat", "Alabama", "Autauga", "SP", True)],
+        # "in" is not Indiana
+        ["What is covered in the basic provisions for wheat?", ("Wheat", None, None, "BP", True)],
+        # county cue without a known county
+        ["What are the dates for apples in Kittitas county?", ("Apples", None, None, None, False)],
+        # county named after another state
+        ["Wheat in Washington county, Oregon", ("Wheat", "Washington", None, None, False)],
+    ]
+)
+def test_extract(extractor: LocalEntityExtractor, question: str, expected: tuple):
+    assert tuple(extractor.extract(question)) == expected
+
+
+def test_extract_entities_locally_backs_off_after_failure(monkeypatch):
+    calls = []
+
+    def get_name_index():
+        calls.append(1)
+        raise KeyError("POSTGRES_URI")
+
+    monkeypatch.setattr(entity_extractor, "get_name_index", get_name_index)
+    monkeypatch.setattr(entity_extractor, "_local_entity_extractor", None)
+    monkeypatch.setattr(entity_extractor, "_local_entity_extractor_failed_at", None)
+
+    assert extract_entities_locally("apples in Yakima county") is None
+    assert extract_entities_locally("apples in Yakima county") is None
+    assert len(calls) == 1
+
+    # retried once the delay is over
+    monkeypatch.setattr(entity_extractor, "GAZETTEERS_RETRY_DELAY", 0)
+    assert extract_entities_locally("apples in Yakima county") is None
+    assert len(calls) == 2
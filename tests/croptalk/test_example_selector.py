@@ -0,0 +1,36 @@
+import os
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from croptalk.example_selector import get_examples_hash, load_example_selector
+
+EXAMPLES = [
+    {"input": "total of policies sold in New York", "query": "SELECT SUM(policies_sold_count) FROM sob_all_years"},
+    {"input": "average loss ratio by insurance plan", "query": "SELECT SUM(loss_ratio_weighted_sum) FROM sob_rollup_plan"},
+]
+
+
+@pytest.fixture
+def embeddings() -> DeterministicFakeEmbedding:
+    return DeterministicFakeEmbedding(size=16)
+
+
+def test_index_is_persisted_and_reused(tmp_path, embeddings, monkeypatch):
+    selector = load_example_selector(EXAMPLES, embeddings, index_dir=str(tmp_path), k=1, input_keys=["input"])
+    assert os.listdir(tmp_path) == [get_examples_hash(EXAMPLES, embeddings)]
+
+    # examples are not embedded again
+    def from_texts(*args, **kwargs):
+        raise AssertionError("examples should not be embedded again")
+
+    monkeypatch.setattr(FAISS, "from_texts", from_texts)
+    reloaded = load_example_selector(EXAMPLES, embeddings, index_dir=str(tmp_path), k=1, input_keys=["input"])
+
+    question = "total of policies sold in New York"
+    assert reloaded.select_examples({"input": question}) == selector.select_examples({"input": question})
+
+
+def test_examples_hash_changes_with_examples(embeddings):
+    assert get_examples_hash(EXAMPLES, embeddings) != get_examples_hash(EXAMPLES[:1], embeddings)
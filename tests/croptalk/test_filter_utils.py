@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+
+from croptalk import filter_utils
+from croptalk.filter_utils import FilterCodes, resolve_filter_codes
+from croptalk.name_index import NameIndex
+
+
+class FakeLookup:
+    def __init__(self, codes: dict) -> None:
+        self.codes = codes
+
+    def find(self, name: str):
+        code = self.codes.get(name)
+        return SimpleNamespace(code=code) if code else None
+
+    def find_by_name(self, name: str, state: str):
+        return self.find(name)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    filter_utils.codes_cache.invalidate()
+    yield
+    filter_utils.codes_cache.invalidate()
+
+
+def fail_to_load():
+    raise ConnectionError("database unavailable")
+
+
+def test_resolve_filter_codes_through_name_index(monkeypatch):
+    name_index = NameIndex(
+        states=[("53", "Washington", "WA")],
+        counties=[("53", "077", "Yakima")],
+        commodities=[("0054", "Apples")],
+    )
+    monkeypatch.setattr(filter_utils, "get_name_index", lambda: name_index)
+
+    assert resolve_filter_codes("WA", "Yakima County", "apples") == FilterCodes("53", "077", "0054")
+
+
+def test_resolve_filter_codes_falls_back_to_lookups_when_index_fails(monkeypatch):
+    monkeypatch.setattr(filter_utils, "get_name_index", fail_to_load)
+    monkeypatch.setattr(filter_utils, "get_fallback_lookups", lambda: (
+        FakeLookup({"Washington": "53"}), FakeLookup({"Yakima": "077"}), FakeLookup({"Apples": "0054"})
+    ))
+
+    # filters are still applied
+    assert resolve_filter_codes("Washington", "Yakima", "Apples") == FilterCodes("53", "077", "0054")
+    # and not cached, the index is used again once it loads
+    assert len(filter_utils.codes_cache) == 0
+
+
+def test_resolve_filter_codes_fails_loudly_without_any_lookup(monkeypatch):
+    monkeypatch.setattr(filter_utils, "get_name_index", fail_to_load)
+
+    def no_lookups():
+        raise RuntimeError("dsmain lookups not installed")
+
+    monkeypatch.setattr(filter_utils, "get_fallback_lookups", no_lookups)
+
+    with pytest.raises(RuntimeError):
+        resolve_filter_codes("Washington", None, "Apples")
@@ -0,0 +1,69 @@
+import pytest
+
+from croptalk.commodities import find_commodity_in_text
+from croptalk.fuzzy_matcher import TrigramMatcher
+
+
+@pytest.fixture(scope="module")
+def matcher() -> TrigramMatcher:
+    return TrigramMatcher(
+        choices={
+            "Apples": "Apples",
+            "Cherries": "Cherries",
+            "Corn": "Corn",
+            "Sweet Corn": "Sweet Corn",
+            "Grain Sorghum": "Grain Sorghum",
+            "Milo": "Grain Sorghum",
+        },
+        threshold=0.8,
+    )
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ["apples", "Apples"],
+        ["Apple", "Apples"],
+        ["cherry", "Cherries"],
+        ["milo", "Grain Sorghum"],
+        ["sweet corn", "Sweet Corn"],
+        ["appels", None],
+        ["spaceships", None],
+    ]
+)
+def test_match(matcher: TrigramMatcher, query: str, expected: str):
+    assert matcher.match(query) == expected
+
+
+def test_rank_is_sorted_and_deduplicated(matcher: TrigramMatcher):
+    ranked = matcher.rank("sorghum milo", limit=10)
+    scores = [score for _, score in ranked]
+    assert scores == sorted(scores, reverse=True)
+    assert len({value for value, _ in ranked}) == len(ranked)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ["are apples produced in yakima county washington?", "Apples"],
+        ["final planting date for sweet corn in Iowa", "Sweet Corn"],
+        ["Show me sections of CIH related to optional units", None],
+    ]
+)
+def test_extract(matcher: TrigramMatcher, text: str, expected: str):
+    match = matcher.extract(text)
+    assert (match[0] if match else None) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ["What is the final planting date for Virginia type peanuts in Baldwin County, Alabama?", "Peanuts"],
+        ["what is the price of strawberry in CA", "Strawberries"],
+        ["total of policies sold in New York for the WFRP policy", "Whole Farm Revenue Protection"],
+        ["What is the definition of a unit?", None],
+    ]
+)
+def test_find_commodity_in_text(text: str, expected: str):
+    match = find_commodity_in_text(text)
+    assert (match[0] if match else None) == expected
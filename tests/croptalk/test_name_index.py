@@ -0,0 +1,68 @@
+import pytest
+
+from croptalk.name_index import NameIndex
+
+
+@pytest.fixture(scope="module")
+def name_index() -> NameIndex:
+    return NameIndex(
+        states=[("53", "Washington", "WA"), ("06", "California", "CA"), ("22", "Louisiana", "LA")],
+        counties=[("53", "077", "Yakima"), ("53", "071", "Walla Walla"), ("06", "111", "Ventura"),
+                  ("22", "001", "Acadia")],
+        commodities=[("0054", "Apples"), ("0028", "Almonds"), ("0041", "Corn"),
+                     ("0088", "Pasture,Rangeland,Forage")],
+    )
+
+
+@pytest.mark.parametrize(
+    "state, expected_code",
+    [
+        ["Washington", "53"],
+        ["washington state", "53"],
+        ["WA", "53"],
+        ["  CALIFORNIA ", "06"],
+        ["6", "06"],
+        ["Californa", "06"],
+        ["Texas", None],
+    ]
+)
+def test_find_state(name_index: NameIndex, state: str, expected_code: str):
+    entry = name_index.find_state(state)
+    assert (entry.code if entry else None) == expected_code
+
+
+@pytest.mark.parametrize(
+    "county, state, expected_code",
+    [
+        ["Yakima", "Washington", "077"],
+        ["Yakima County", "WA", "077"],
+        ["walla walla county", "Washington", "071"],
+        ["Acadia Parish", "Louisiana", "001"],
+        ["77", "53", "077"],
+        ["Yakima", "California", None],
+        ["Yakima", "Texas", None],
+    ]
+)
+def test_find_county(name_index: NameIndex, county: str, state: str, expected_code: str):
+    entry = name_index.find_county(county, state)
+    assert (entry.code if entry else None) == expected_code
+
+
+@pytest.mark.parametrize(
+    "commodity, expected_name",
+    [
+        ["apples", "Apples"],
+        ["apple", "Apples"],
+        ["ALMONDS", "Almonds"],
+        ["pasture, rangeland, forage", "Pasture,Rangeland,Forage"],
+        ["spaceships", None],
+    ]
+)
+def test_find_commodity(name_index: NameIndex, commodity: str, expected_name: str):
+    entry = name_index.find_commodity(commodity)
+    assert (entry.name if entry else None) == expected_name
+
+
+def test_get_counties(name_index: NameIndex):
+    assert [entry.code for entry in name_index.get_counties("WA")] == ["071", "077"]
+    assert name_index.get_counties("Texas") == []
@@ -0,0 +1,63 @@
+import pytest
+
+from croptalk.route_classifier import (OTHER_TOPIC, TOOLS_TOPIC, RouteClassifier, get_training_examples,
+                                       load_route_classifier)
+
+
+@pytest.fixture(scope="module")
+def route_classifier() -> RouteClassifier:
+    return RouteClassifier.train(get_training_examples())
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ["Find me the SP document for almond, san joaquin, california in 2024", TOOLS_TOPIC],
+        ["What are the commodities insured with WFRP for reinsurance year 2024, state code 04 and county code 001",
+         TOOLS_TOPIC],
+        ["what's the claim probability for cherries in WA by coverage level", TOOLS_TOPIC],
+        ["Show me sections of CIH related to optional units", OTHER_TOPIC],
+        ["Definition of pickling period for strawberries", OTHER_TOPIC],
+    ],
+)
+def test_classify_rules(route_classifier, question, expected):
+    decision = route_classifier.classify(question)
+    assert (decision.topic, decision.confidence, decision.source) == (expected, 1.0, "rules")
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        # SOB metrics named in policy document questions, without any market data cue
+        "what is the liability under the Basic Provisions",
+        "How is liability calculated for apples?",
+        "What does the policy say about loss ratio adjustments?",
+        "What is the expected payout of a prevented planting claim?",
+    ],
+)
+def test_classify_policy_terms_not_routed_to_tools_by_rules(route_classifier, question):
+    decision = route_classifier.classify(question)
+    assert (decision.topic, decision.source) != (TOOLS_TOPIC, "rules")
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ["which coverage level is the most popular for oranges", TOOLS_TOPIC],
+        ["What is the Sales Closing Date for Pecans in Alabama, Baldwin", OTHER_TOPIC],
+    ],
+)
+def test_classify_model(route_classifier, question, expected):
+    decision = route_classifier.classify(question)
+    assert decision.source == "model"
+    assert decision.topic == expected
+    assert 0.5 <= decision.confidence <= 1
+
+
+def test_load_route_classifier(tmp_path):
+    question = "which coverage level is the most popular for oranges"
+    trained = load_route_classifier(str(tmp_path))
+    assert len(list(tmp_path.glob("*.joblib"))) == 1
+
+    loaded = load_route_classifier(str(tmp_path))
+    assert loaded.classify(question) == trained.classify(question)
@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+from croptalk import s3_cache
+from croptalk.s3_cache import S3PDFCache
+
+
+class FakeS3Client:
+    def __init__(self) -> None:
+        self.etag = "v1"
+        self.content = b"first page|second page"
+        self.get_calls = 0
+        self.head_calls = 0
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        self.get_calls += 1
+        return {"ETag": f'"{self.etag}"', "Body": io.BytesIO(self.content)}
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        self.head_calls += 1
+        return {"ETag": f'"{self.etag}"'}
+
+
+@pytest.fixture
+def s3_client(monkeypatch) -> FakeS3Client:
+    client = FakeS3Client()
+    monkeypatch.setattr(s3_cache, "get_s3_client", lambda: client)
+    # pages are separated by "|" in fake documents
+    monkeypatch.setattr(s3_cache, "extract_pdf_pages", lambda pdf_data: pdf_data.decode().split("|"))
+    return client
+
+
+def test_get_pages_miss_then_hit(tmp_path, s3_client: FakeS3Client):
+    cache = S3PDFCache(str(tmp_path))
+
+    assert cache.get_pages("bucket", "doc.pdf") == ["first page", "second page"]
+    assert cache.get_pages("bucket", "doc.pdf") == ["first page", "second page"]
+
+    assert s3_client.get_calls == 1
+    # not revalidated before revalidate_after
+    assert s3_client.head_calls == 0
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    # only extracted text and metadata are written, not the PDF
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".json", ".meta"]
+
+
+def test_get_pages_revalidates_etag(tmp_path, s3_client: FakeS3Client):
+    cache = S3PDFCache(str(tmp_path), revalidate_after=0)
+    cache.get_pages("bucket", "doc.pdf")
+
+    # same ETag, served from disk
+    assert cache.get_pages("bucket", "doc.pdf") == ["first page", "second page"]
+    assert (s3_client.head_calls, s3_client.get_calls) == (1, 1)
+
+    # document updated in S3, downloaded again
+    s3_client.etag = "v2"
+    s3_client.content = b"updated page"
+    assert cache.get_pages("bucket", "doc.pdf") == ["updated page"]
+    assert s3_client.get_calls == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_documents_are_evicted(tmp_path, s3_client: FakeS3Client):
+    cache = S3PDFCache(str(tmp_path), max_bytes=1)
+    cache.get_pages("bucket", "doc.pdf")
+    assert cache.stats()["size_bytes"] <= 1
+    assert cache.get_pages("bucket", "doc.pdf") == ["first page", "second page"]
+    assert s3_client.get_calls == 2
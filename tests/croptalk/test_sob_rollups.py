@@ -0,0 +1,55 @@
+from typing import Optional
+
+import pytest
+
+from croptalk.sob_rollups import SOB_ROLLUPS, describe_rollups, find_rollup, get_rollup_query
+
+ALL_TABLES = ["sob_all_years"] + [rollup.table for rollup in SOB_ROLLUPS]
+
+
+@pytest.mark.parametrize(
+    "query, expected_table",
+    [
+        ["SELECT SUM(policies_sold_count) AS total_policies_sold FROM sob_all_years WHERE state_abbreviation = 'NY' "
+         "AND insurance_plan_name_abbreviation = 'WFRP' AND commodity_year = 2023", "sob_rollup_state"],
+        ["SELECT SUM(loss_ratio * policies_sold_count) / SUM(policies_sold_count) AS average_loss_ratio "
+         "FROM sob_all_years GROUP BY commodity_year, insurance_plan_name_abbreviation", "sob_rollup_plan"],
+        ["SELECT SUM(cost_to_grower * policies_sold_count) / SUM(policies_sold_count) FROM sob_all_years "
+         "WHERE county_name = 'Fresno' AND state_abbreviation = 'CA' AND commodity_name = 'walnuts'", "sob_rollup_county"],
+        # coverage_level is not aggregated in any rollup
+        ["SELECT SUM(policies_sold_count) FROM sob_all_years WHERE county_name = 'Bee' AND state_abbreviation = 'TX' "
+         "AND coverage_level = 0.7", None],
+        ["SELECT SUM(policies_sold_count) FROM sob_rollup_state WHERE state_abbreviation = 'NY'", None],
+        # aggregates whose answer changes over pre-aggregated rows
+        ["SELECT COUNT(*) FROM sob_all_years WHERE county_name = 'Bee' AND state_abbreviation = 'TX'", None],
+        ["SELECT AVG(loss_ratio) FROM sob_all_years WHERE commodity_year = 2023", None],
+        ["SELECT MAX(loss_ratio) FROM sob_all_years WHERE state_abbreviation = 'CA'", None],
+        ["SELECT MIN(total_premium_amount) FROM sob_all_years GROUP BY commodity_year", None],
+        # row level filter and non-aggregated measure
+        ["SELECT SUM(policies_sold_count) FROM sob_all_years WHERE loss_ratio > 1", None],
+        ["SELECT commodity_name, liability_amount FROM sob_all_years WHERE commodity_year = 2023", None],
+        # weighted column summed without its weight
+        ["SELECT SUM(loss_ratio) FROM sob_all_years WHERE commodity_year = 2023", None],
+    ]
+)
+def test_find_rollup(query: str, expected_table: Optional[str]):
+    rollup = find_rollup(query, ALL_TABLES)
+    assert (rollup.table if rollup is not None else None) == expected_table
+
+
+def test_find_rollup_ignores_missing_tables():
+    query = "SELECT SUM(policies_sold_count) FROM sob_all_years WHERE commodity_year = 2023"
+    assert find_rollup(query, ["sob_all_years"]) is None
+    assert find_rollup(query, ["sob_all_years", "sob_rollup_county"]).table == "sob_rollup_county"
+
+
+def test_describe_rollups():
+    assert describe_rollups(["sob_all_years"]) == ""
+    assert "sob_rollup_county" in describe_rollups(ALL_TABLES)
+
+
+def test_get_rollup_query():
+    query = get_rollup_query(SOB_ROLLUPS[0], "sob_rollup_plan_new")
+    assert query.startswith("CREATE TABLE sob_rollup_plan_new AS SELECT commodity_year")
+    assert "SUM(loss_ratio * policies_sold_count) AS loss_ratio_weighted_sum" in query
+    assert query.endswith("GROUP BY commodity_year, insurance_plan_name_abbreviation, commodity_name")
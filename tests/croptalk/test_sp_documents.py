@@ -0,0 +1,54 @@
+import threading
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from croptalk import sp_documents
+from croptalk.sp_documents import SPFileIndex
+
+
+def test_sp_file_index_backs_off_after_failed_load(monkeypatch):
+    index = SPFileIndex(retry_after=60)
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        raise SQLAlchemyError("database unreachable")
+
+    monkeypatch.setattr(index, "load", load)
+
+    assert index.get("apples", "washington", "yakima") is None
+    assert index.get("apples", "washington", "yakima") is None
+    assert len(attempts) == 1
+
+    # retried once the delay is over
+    index.retry_after = 0
+    assert index.get("apples", "washington", "yakima") is None
+    assert len(attempts) == 2
+
+
+def test_get_engine_creates_a_single_engine_across_threads(monkeypatch):
+    monkeypatch.setenv("POSTGRES_URI", "postgresql://localhost/croptalk")
+    monkeypatch.setattr(sp_documents, "_engine", None)
+    barrier = threading.Barrier(8)
+    created = []
+
+    def create_engine(*args, **kwargs):
+        # slow enough for the other threads to check the singleton meanwhile
+        time.sleep(0.05)
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(sp_documents, "create_engine", create_engine)
+
+    def get_engine():
+        barrier.wait()
+        sp_documents.get_engine()
+
+    threads = [threading.Thread(target=get_engine) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from langchain_core.runnables import RunnableLambda
+
+from croptalk import speculative
+from croptalk.speculative import CANCELLED, DISCARDED, WON, SpeculativeRouter
+
+
+def create_router(route, branches) -> SpeculativeRouter:
+    return SpeculativeRouter(
+        route=route,
+        branches=branches,
+        select=lambda output: "tools" if "tools" in output else "retrieval",
+    )
+
+
+def test_ainvoke_runs_route_and_branches_concurrently():
+    async def run():
+        retrieval_started = asyncio.Event()
+        never_set = asyncio.Event()
+
+        async def route(x):
+            # would time out if branches were only started after the route
+            await asyncio.wait_for(retrieval_started.wait(), timeout=5)
+            return "tools"
+
+        async def tools(x):
+            return f"tools: {x['question']}"
+
+        async def retrieval(x):
+            retrieval_started.set()
+            await never_set.wait()
+
+        router = create_router(RunnableLambda(route), {"tools": RunnableLambda(tools),
+                                                       "retrieval": RunnableLambda(retrieval)})
+        return router, await router.ainvoke({"question": "q"}, {})
+
+    router, output = asyncio.run(run())
+
+    assert output == "tools: q"
+    stats = router.metrics.stats()
+    assert stats["tools"][WON] == 1
+    # still running when the route was known
+    assert stats["retrieval"][CANCELLED] == 1
+
+
+def test_ainvoke_discards_completed_branch(monkeypatch):
+    # fake clock, advanced by the runnables, to check the time counted for the losing branch
+    clock = {"now": 0.0}
+    monkeypatch.setattr(speculative, "time", SimpleNamespace(perf_counter=lambda: clock["now"]))
+
+    async def run():
+        tools_done = asyncio.Event()
+
+        async def route(x):
+            await asyncio.wait_for(tools_done.wait(), timeout=5)
+            # let the branch task complete
+            for _ in range(10):
+                await asyncio.sleep(0)
+            clock["now"] += 10
+            return "other"
+
+        async def tools(x):
+            clock["now"] += 1
+            tools_done.set()
+            return "tools"
+
+        async def retrieval(x):
+            return "retrieval"
+
+        router = create_router(RunnableLambda(route), {"tools": RunnableLambda(tools),
+                                                       "retrieval": RunnableLambda(retrieval)})
+        return router, await router.ainvoke({"question": "q"}, {})
+
+    router, output = asyncio.run(run())
+
+    assert output == "retrieval"
+    stats = router.metrics.stats()
+    assert stats["tools"][DISCARDED] == 1
+    # running time of the branch itself, not of the route
+    assert stats["tools"]["wasted_seconds"] == 1.0
+
+
+def test_invoke_discards_running_branch_and_starts_non_speculative_one():
+    retrieval_started = threading.Event()
+    release = threading.Event()
+
+    def route(x):
+        assert retrieval_started.wait(timeout=5)
+        return "tools"
+
+    def retrieval(x):
+        retrieval_started.set()
+        release.wait(timeout=5)
+        return "retrieval"
+
+    router = create_router(RunnableLambda(route), {"tools": RunnableLambda(lambda x: f"tools: {x['question']}"),
+                                                   "retrieval": RunnableLambda(retrieval)})
+    router.speculative = ["retrieval"]
+
+    assert router.invoke({"question": "q"}, {}) == "tools: q"
+
+    # the losing branch cannot be interrupted, it is recorded once done
+    release.set()
+    router._executor.shutdown(wait=True)
+    stats = router.metrics.stats()
+    assert "tools" not in stats
+    assert stats["retrieval"][DISCARDED] == 1
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+from croptalk.warmup import FAILED, READY, WarmUp
+
+
+def test_warm_up_runs_tasks_concurrently():
+    # both tasks wait for each other, they would deadlock if they were run sequentially
+    barrier = threading.Barrier(2, timeout=5)
+    warm_up = WarmUp({"first": barrier.wait, "second": barrier.wait})
+    assert not warm_up.done
+    assert warm_up.report()["first"] == {"status": "pending", "latency_ms": None, "required": True}
+
+    statuses = asyncio.run(warm_up.run())
+
+    assert warm_up.done
+    assert warm_up.ready
+    assert statuses == {"first": READY, "second": READY}
+    assert all(report["latency_ms"] is not None for report in warm_up.report().values())
+
+
+def test_warm_up_reports_failures():
+    def fail():
+        raise ConnectionError("unreachable")
+
+    warm_up = WarmUp({"ok": lambda: None, "ko": fail})
+    statuses = asyncio.run(warm_up.run())
+
+    assert warm_up.done
+    assert statuses["ok"] == READY
+    assert statuses["ko"] == f"{FAILED}: unreachable"
+
+
+def test_warm_up_not_ready_when_required_task_failed():
+    attempts = []
+
+    def fail_once():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("unreachable")
+
+    def fail():
+        raise ConnectionError("unreachable")
+
+    warm_up = WarmUp({"ok": lambda: None, "database": fail_once}, optional_tasks={"monitoring": fail})
+    asyncio.run(warm_up.run())
+
+    assert warm_up.done
+    assert not warm_up.ready
+    assert warm_up.failed_required() == ["database"]
+
+    # optional failures never block readiness
+    asyncio.run(warm_up.run(warm_up.failed_required()))
+    assert warm_up.ready
+    assert warm_up.report()["monitoring"]["status"] == f"{FAILED}: unreachable"
+    assert warm_up.report()["monitoring"]["required"] is False